@@ -3,9 +3,32 @@ import datetime
 import pytest
 from django.contrib.auth.models import User
 
+from django.core.cache import caches
 from django.test import Client
 
 from lunchtime.models import Restaurant, Meal, Table, Review, Reservation
+from lunchtime.seeding import seed_database, SCALES
+
+
+@pytest.fixture(autouse=True)
+def budgets(settings):
+    """Fail tests of views which exceed their budgets of queries and time."""
+    settings.LUNCHTIME_BUDGETS_RAISE = True
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches, as ids of rows are reused between tests."""
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def seeded_data(request, db):
+    """Generate synthetic data of scale given by indirect parametrization, by name or by arguments of
+    seed_database, tiny by default."""
+    scale = getattr(request, 'param', 'tiny')
+    return seed_database(**(SCALES[scale] if isinstance(scale, str) else scale))
 
 
 @pytest.fixture
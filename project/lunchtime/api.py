@@ -0,0 +1,132 @@
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+
+from .pagination import keyset_page
+
+
+def make_etag(*parts):
+    """Return strong ETag, in quotes, which changes whenever any of parts changes."""
+    return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def logo_url(name):
+    """Return URL of stored logo or None."""
+    return default_storage.url(name) if name else None
+
+
+def resource_rows(view_class, limit=None, **kwargs):
+    """Return list of objects of JSON resource of view class for URL kwargs, with default fields, in order of
+    its pages. At most limit objects are read, all of them without limit.
+    """
+    view = view_class(kwargs=kwargs)
+    fields = list(view.default_fields or view.api_fields)
+    rows = view.get_queryset().values(*view.get_columns(fields))
+    if view.keyset_ordering:
+        rows = rows.order_by(*view.keyset_ordering)
+    return [view.serialize(row, fields) for row in rows[:limit]]
+
+
+class InvalidFields(ValueError):
+    """Raised when request asks for fields which resource doesn't have."""
+
+
+class ConditionalGetMixin:
+    """Send ETag of resource and answer request with matching If-None-Match by 304 Not Modified.
+
+    ETag is computed from version of resource before view does any work, so unchanged resource costs
+    at most the query which reads its version. Query string is part of ETag, because it selects fields.
+    """
+    def get_version(self):
+        """Return value which changes whenever resource changes."""
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag = make_etag(request.path, request.GET.urlencode(), self.get_version())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        return response
+
+
+class SparseFieldsMixin:
+    """Select only fields listed in `fields` GET parameter, e.g. ?fields=id,name, from database.
+
+    `api_fields` lists fields which can be selected, `default_fields` the ones sent when parameter is
+    missing. Fields in `columns` are read from given lookups, e.g. of related model, and values of fields
+    in `converters` are passed through the given functions.
+    """
+    api_fields = ('id',)
+    default_fields = None
+    columns = {}
+    converters = {}
+
+    def get_fields(self):
+        """Return list of fields requested by client. Raise InvalidFields for unknown fields."""
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.default_fields or self.api_fields)
+        fields = list(dict.fromkeys(field.strip() for field in requested.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in self.api_fields]
+        if unknown or not fields:
+            raise InvalidFields(f'Nieznane pola: {", ".join(unknown)}.')
+        return fields
+
+    def get_columns(self, fields):
+        """Return lookups which select given fields."""
+        return [self.columns.get(field, field) for field in fields]
+
+    def serialize(self, row, fields):
+        """Return dictionary of requested fields of row read by values()."""
+        data = {field: row[self.columns.get(field, field)] for field in fields}
+        for field, convert in self.converters.items():
+            if field in data:
+                data[field] = convert(data[field])
+        return data
+
+
+class JsonApiMixin(ConditionalGetMixin, SparseFieldsMixin):
+    """Read-only JSON resource: a single object or a page of objects ordered by keyset.
+
+    Subclass sets `get_queryset()`. Resource with `keyset_ordering` is a list paginated by `cursor`
+    GET parameter, otherwise it is the single object of queryset. Empty list of missing parent object,
+    e.g. meals of missing restaurant, is answered by 404.
+    """
+    keyset_ordering = None
+    page_size = 50
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get_parent_queryset(self):
+        """Return queryset of object which listed objects belong to, None if they don't belong to any."""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_fields()
+        except InvalidFields as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        if self.keyset_ordering is None:
+            row = self.get_queryset().values(*self.get_columns(fields)).first()
+            if row is None:
+                return JsonResponse({'error': 'Nie znaleziono.'}, status=404)
+            return JsonResponse(self.serialize(row, fields))
+        keys = [field.lstrip('-') for field in self.keyset_ordering]
+        columns = list(dict.fromkeys(self.get_columns(fields) + keys))
+        try:
+            page = keyset_page(self.get_queryset().values(*columns), self.keyset_ordering, self.page_size,
+                               request.GET.get('cursor'))
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        parent = self.get_parent_queryset()
+        if not page.object_list and parent is not None and not parent.exists():
+            return JsonResponse({'error': 'Nie znaleziono.'}, status=404)
+        return JsonResponse({'results': [self.serialize(row, fields) for row in page.object_list],
+                             'next': page.next_cursor})
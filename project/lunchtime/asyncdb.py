@@ -0,0 +1,37 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+async def run_query(function, *args):
+    """Run function which reads database in the thread where Django runs synchronous code of request.
+
+    Django 3.1 has no asynchronous ORM, so queries are run by sync_to_async. Thread sensitive mode keeps
+    one connection for the whole request, which Django closes when request finishes. Queries of one
+    request belong in one call, e.g. of function which runs them all.
+    """
+    return await sync_to_async(function, thread_sensitive=True)(*args)
+
+
+def _in_worker(function):
+    """Call function in worker thread between closing of connections which are too old or broken, as Django
+    does around every request."""
+    close_old_connections()
+    try:
+        return function()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(*functions):
+    """Run functions without arguments, which read database independently, concurrently. Return list of
+    their results.
+
+    Every function runs in worker thread with connection of its own, so its queries don't wait for the
+    others. Connection of worker is kept for CONN_MAX_AGE seconds, like connection of request, so with
+    persistent connections a call doesn't connect to database again. Functions don't see changes not
+    committed by request.
+    """
+    worker = sync_to_async(_in_worker, thread_sensitive=False)
+    return await asyncio.gather(*(worker(function) for function in functions))
@@ -0,0 +1,36 @@
+from django.db import connection
+
+from .cache import LRUCache
+from .models import Restaurant
+from .text import fold
+
+AUTOCOMPLETE_LIMIT = 10
+
+prefix_cache = LRUCache(maxsize=512, timeout=60)
+
+
+def startswith(queryset, field, prefix):
+    """Filter queryset by prefix of field in a way which the database can answer from index.
+
+    PostgreSQL uses LIKE with pattern ops index. Other databases compare strings with binary collation,
+    so prefix is turned into range of values.
+    """
+    if connection.vendor == 'postgresql':
+        return queryset.filter(**{f'{field}__startswith': prefix})
+    return queryset.filter(**{f'{field}__gte': prefix, f'{field}__lt': prefix + chr(0x10ffff)})
+
+
+def restaurants_by_prefix(prefix):
+    """Return tuple of ids and names of restaurants whose name begins with prefix, ignoring case and diacritics.
+
+    Results for hot prefixes are kept in process for a short time.
+    """
+    prefix = fold(prefix).strip()[:64]
+    if not prefix:
+        return ()
+
+    def lookup():
+        restaurants = startswith(Restaurant.objects.all(), 'name_folded', prefix)
+        return tuple(restaurants.order_by('name_folded', 'id').values_list('id', 'name')[:AUTOCOMPLETE_LIMIT])
+
+    return prefix_cache.get_or_set(prefix, lookup)
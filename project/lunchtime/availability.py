@@ -0,0 +1,61 @@
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils.dateparse import parse_time
+
+from .holds import active_holds
+from .models import Reservation, Restaurant, Table, DEFAULT_DURATION, end_of_interval
+
+AVAILABLE_RESTAURANTS_LIMIT = 50
+
+
+def busy_tables(restaurant_id, date, start, end):
+    """Return ids of restaurant's tables with reservation overlapping interval from start to end."""
+    return Reservation.objects.filter(restaurant_id=restaurant_id, date=date,
+                                      time__lt=end, end_time__gt=start).values('table_id')
+
+
+def held_tables(date, time, duration=DEFAULT_DURATION, user=None):
+    """Return queryset of ids of tables held at date and time by users other than given one."""
+    holds = active_holds(date, time, duration)
+    if user is not None:
+        holds = holds.exclude(user=user)
+    return holds.values('table_id')
+
+
+def free_tables(restaurant_id, date, time, persons=1, duration=DEFAULT_DURATION, user=None):
+    """Return restaurant's tables with at least given number of seats which are free at date and time.
+
+    Reservations are looked up by (restaurant, date, time, end_time) index, so only reservations from
+    the given day are read, no matter how many reservations are stored in database. Tables held by
+    users other than given one aren't free either.
+    """
+    start = parse_time(time) if isinstance(time, str) else time
+    end = end_of_interval(start, duration)
+    return Table.objects.filter(restaurant_id=restaurant_id, persons__gte=persons) \
+        .exclude(id__in=busy_tables(restaurant_id, date, start, end)) \
+        .exclude(id__in=held_tables(date, start, duration, user)) \
+        .order_by('persons', 'id')
+
+
+def open_at(time):
+    """Return condition which selects restaurants open at given time, including those closing after midnight."""
+    return Q(opens_at__lte=time, closes_at__gt=time) \
+        | Q(closes_at__lt=F('opens_at')) & (Q(opens_at__lte=time) | Q(closes_at__gt=time))
+
+
+def available_restaurants(date, time, persons=1, duration=DEFAULT_DURATION, limit=AVAILABLE_RESTAURANTS_LIMIT,
+                          user=None):
+    """Return restaurants open at date and time which have free table with at least given number of seats.
+
+    Restaurants are ranked by rating and found in one query: for every open restaurant the database looks
+    for a big enough table without overlapping reservation, using (table, date, time) index of reservations,
+    and without hold of other user than given one, using (table, date, slot) index of holds.
+    """
+    start = parse_time(time) if isinstance(time, str) else time
+    end = end_of_interval(start, duration)
+    overlapping = Reservation.objects.filter(table=OuterRef('pk'), date=date, time__lt=end, end_time__gt=start)
+    held = active_holds(date, start, duration).filter(table=OuterRef('pk'))
+    if user is not None:
+        held = held.exclude(user=user)
+    free = Table.objects.filter(restaurant=OuterRef('pk'), persons__gte=persons) \
+        .filter(~Exists(overlapping)).filter(~Exists(held))
+    return Restaurant.objects.filter(open_at(start)).filter(Exists(free)).order_by('-rating', 'name', 'id')[:limit]
@@ -0,0 +1,197 @@
+import asyncio
+import datetime
+import random
+import re
+import statistics
+import threading
+import time as timer
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client
+
+from .models import Restaurant
+from .seeding import USERNAME_PREFIX
+
+BOOKING_STEPS = ['select_date_time', 'submit_date_time', 'select_restaurant', 'add_reservation',
+                 'submit_reservation', 'reservation_list']
+API_STEPS = ['restaurant', 'menu', 'availability']
+
+
+class LoadResult:
+    """Latencies of steps of booking scenarios run by load generator."""
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(int)
+        self.errors = []
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, step, seconds):
+        with self.lock:
+            self.latencies[step].append(seconds)
+
+    def count(self, outcome):
+        with self.lock:
+            self.outcomes[outcome] += 1
+
+    def requests(self):
+        """Return number of requests sent."""
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def percentiles(self, step=None):
+        """Return p50, p95 and p99 latency in milliseconds of step or of all requests."""
+        latencies = self.latencies[step] if step else [seconds for latencies in self.latencies.values()
+                                                        for seconds in latencies]
+        if len(latencies) < 2:
+            latencies = latencies * 2 or [0.0, 0.0]
+        quantiles = statistics.quantiles([seconds * 1000 for seconds in latencies], n=100, method='inclusive')
+        return quantiles[49], quantiles[94], quantiles[98]
+
+    def latency_lines(self, steps):
+        """Return lines with latency percentiles of given steps and of all requests."""
+        lines = []
+        for step in list(steps) + [None]:
+            if step is None or self.latencies[step]:
+                p50, p95, p99 = self.percentiles(step)
+                lines.append(f'{step or "all":<20} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   p99 {p99:8.2f} ms')
+        return lines
+
+    def report(self):
+        """Return lines of human readable report."""
+        return [f'{connection.vendor}: {self.outcomes["booked"]} booked, {self.outcomes["conflict"]} conflicts, '
+                f'{self.outcomes["full"]} without free table, {len(self.errors)} errors in {self.elapsed:.1f} s',
+                f'throughput {self.requests() / self.elapsed:.1f} requests/s, '
+                f'{sum(self.outcomes.values()) / self.elapsed:.1f} scenarios/s'] + self.latency_lines(BOOKING_STEPS)
+
+
+def _get(result, client, step, url, data=None, method='get'):
+    start = timer.perf_counter()
+    try:
+        response = getattr(client, method)(url, data)
+    except Exception as error:
+        raise RuntimeError(f'{step}: {method.upper()} {url} failed: {error}') from error
+    result.add(step, timer.perf_counter() - start)
+    if response.status_code >= 400 and response.status_code != 409:
+        raise RuntimeError(f'{step}: {method.upper()} {url} returned {response.status_code}')
+    return response
+
+
+def booking_scenario(client, rng, result, days_ahead=30):
+    """Go through reservation path as user does: pick date and time, restaurant, table and meals."""
+    date = datetime.date.today() + datetime.timedelta(days=rng.randint(1, days_ahead))
+    time = datetime.time(rng.randint(12, 18), rng.choice((0, 15, 30, 45)))
+    _get(result, client, 'select_date_time', '/select_date_time/')
+    response = _get(result, client, 'submit_date_time', '/select_date_time/',
+                    {'date': date, 'time': time, 'persons': rng.choice((1, 2, 2, 4))}, 'post')
+    response = _get(result, client, 'select_restaurant', response['Location'])
+    links = re.findall(r'href="(/add_reservation/[^"]+)"', response.content.decode())
+    if not links:
+        return 'full'
+    url = rng.choice(links[:5]).replace('&amp;', '&')
+    content = _get(result, client, 'add_reservation', url).content.decode()
+    tables = re.findall(r'<option value="(\d+)"', content)
+    if not tables:
+        return 'full'
+    meals = re.findall(r'name="meals" value="(\d+)"', content)
+    response = _get(result, client, 'submit_reservation', url,
+                    {'table_id': tables[0], 'meals': rng.sample(meals, min(len(meals), 2))}, 'post')
+    _get(result, client, 'reservation_list', '/reservation_list/')
+    return 'conflict' if response.status_code == 409 else 'booked'
+
+
+def run_load(scenarios=100, concurrency=8, seed=0):
+    """Run booking scenarios of generated users in concurrent threads. Return LoadResult.
+
+    Requests go through the whole Django stack with middleware, but without network. With concurrency
+    of 1 scenarios run in the calling thread, so they see data of its open transaction.
+    """
+    users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id'))
+    result = LoadResult()
+
+    def worker(number):
+        rng = random.Random(seed * 1000003 + number)
+        client = Client(raise_request_exception=False)
+        client.force_login(users[number % len(users)])
+        try:
+            for _ in range(scenarios // concurrency + (number < scenarios % concurrency)):
+                try:
+                    result.count(booking_scenario(client, rng, result))
+                except Exception as error:
+                    with result.lock:
+                        result.errors.append(error)
+        finally:
+            if concurrency > 1:
+                connection.close()
+
+    start = timer.perf_counter()
+    if concurrency == 1:
+        worker(0)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+    result.elapsed = timer.perf_counter() - start
+    return result
+
+
+def api_paths(count, seed=0):
+    """Return list of (endpoint, path) of requests to JSON endpoints of random restaurants, dates and times."""
+    rng = random.Random(seed)
+    restaurant_ids = list(Restaurant.objects.order_by('id').values_list('id', flat=True))
+    today = datetime.date.today()
+    paths = []
+    for _ in range(count):
+        endpoint = rng.choice(API_STEPS)
+        if endpoint == 'restaurant':
+            path = f'/api/restaurants/{rng.choice(restaurant_ids)}/details/'
+        elif endpoint == 'menu':
+            path = f'/api/restaurants/{rng.choice(restaurant_ids)}/menu/'
+        else:
+            date = today + datetime.timedelta(days=rng.randint(0, 30))
+            path = f'/api/availability/{date}/{rng.randint(12, 18)}:{rng.choice(("00", "30"))}/?persons=2'
+        paths.append((endpoint, path))
+    return paths
+
+
+def run_wsgi_load(paths, concurrency=8):
+    """Request paths through WSGI handler from concurrent threads. Return LoadResult."""
+    result = LoadResult()
+
+    def worker(number):
+        client = Client(raise_request_exception=False)
+        try:
+            for endpoint, path in paths[number::concurrency]:
+                try:
+                    _get(result, client, endpoint, path)
+                except Exception as error:
+                    with result.lock:
+                        result.errors.append(error)
+        finally:
+            connection.close()
+
+    start = timer.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    result.elapsed = timer.perf_counter() - start
+    return result
+
+
+async def run_asgi_load(paths, concurrency=8):
+    """Request paths through ASGI handler from concurrent tasks of one event loop. Return LoadResult."""
+    result = LoadResult()
+    client = AsyncClient(raise_request_exception=False)
+
+    async def worker(number):
+        for endpoint, path in paths[number::concurrency]:
+            start = timer.perf_counter()
+            response = await client.get(path)
+            result.add(endpoint, timer.perf_counter() - start)
+            if response.status_code >= 400:
+                result.errors.append(RuntimeError(f'{endpoint}: GET {path} returned {response.status_code}'))
+
+    start = timer.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    result.elapsed = timer.perf_counter() - start
+    return result
@@ -0,0 +1,124 @@
+import datetime
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Reservation, Table, TableSlots, DEFAULT_DURATION, end_of_interval
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_BYTES = SLOTS_PER_DAY // 8
+CACHE_TIMEOUT = 60 * 60
+
+
+def slot_range(start, end):
+    """Return range of indexes of slots which interval from start to end touches, partially used ones too."""
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    end_minutes = end.hour * 60 + end.minute + (1 if end.second or end.microsecond else 0)
+    return range(first, max(min(-(-end_minutes // SLOT_MINUTES), SLOTS_PER_DAY), first))
+
+
+def slot_mask(start, end):
+    """Return bitmap of slots which interval from start to end touches. Partially used slots are included."""
+    slots = slot_range(start, end)
+    first, last = slots.start, slots.stop
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def to_bytes(bitmap):
+    return bitmap.to_bytes(SLOTS_BYTES, 'big')
+
+
+def from_bytes(data):
+    return int.from_bytes(bytes(data), 'big')
+
+
+def _cache_key(restaurant_id, date):
+    return f'lunchtime:slots:{restaurant_id}:{date}'
+
+
+def computed_bitmaps(reservations):
+    """Return dictionary of (table id, date) and bitmap computed from given reservations."""
+    bitmaps = defaultdict(int)
+    for table_id, date, start, end in reservations.values_list('table_id', 'date', 'time', 'end_time'):
+        bitmaps[(table_id, date)] |= slot_mask(start, end)
+    return bitmaps
+
+
+def forget_day(restaurant_id, date):
+    """Remove bitmaps of restaurant's day from cache now and again after transaction is committed.
+
+    The second removal drops bitmaps which concurrent request could cache before the change was committed.
+    """
+    key = _cache_key(restaurant_id, date)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def mark_reservation(reservation):
+    """Set slots of new reservation in bitmap of its table."""
+    table_slots, created = TableSlots.objects.get_or_create(
+        table_id=reservation.table_id, date=reservation.date,
+        defaults={'restaurant_id': reservation.restaurant_id, 'slots': to_bytes(0)})
+    bitmap = from_bytes(table_slots.slots) | slot_mask(reservation.time, reservation.end_time)
+    TableSlots.objects.filter(pk=table_slots.pk).update(slots=to_bytes(bitmap))
+    forget_day(reservation.restaurant_id, reservation.date)
+
+
+def rebuild_table_day(table_id, restaurant_id, date):
+    """Compute bitmap of table's day again from its reservations, e.g. after reservation was removed.
+
+    Slots of removed reservation can't be simply cleared, because other reservation may overlap them.
+    """
+    bitmap = computed_bitmaps(Reservation.objects.filter(table_id=table_id, date=date)).get((table_id, date), 0)
+    if bitmap:
+        TableSlots.objects.update_or_create(table_id=table_id, date=date,
+                                            defaults={'restaurant_id': restaurant_id, 'slots': to_bytes(bitmap)})
+    else:
+        TableSlots.objects.filter(table_id=table_id, date=date).delete()
+    forget_day(restaurant_id, date)
+
+
+def day_bitmaps(restaurant_id, date):
+    """Return dictionary of table id and bitmap of its occupied slots on given day of restaurant."""
+    key = _cache_key(restaurant_id, date)
+    bitmaps = cache.get(key)
+    if bitmaps is None:
+        bitmaps = {table_id: from_bytes(slots) for table_id, slots in
+                   TableSlots.objects.filter(restaurant_id=restaurant_id, date=date).values_list('table_id', 'slots')}
+        cache.set(key, bitmaps, CACHE_TIMEOUT)
+    return bitmaps
+
+
+def free_tables(restaurant_id, date, time, persons=1, duration=DEFAULT_DURATION):
+    """Return list of restaurant's tables with at least given number of seats which are free at date and time.
+
+    Occupied tables are found by bitwise and of bitmaps with slots of requested interval. Bitmaps are
+    rounded to whole slots, so table reserved until 12:10 is busy until 12:15.
+    """
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    if isinstance(time, str):
+        time = datetime.time.fromisoformat(time)
+    mask = slot_mask(time, end_of_interval(time, duration))
+    bitmaps = day_bitmaps(restaurant_id, date)
+    return [table for table in Table.objects.filter(restaurant_id=restaurant_id, persons__gte=persons)
+            .order_by('persons', 'id') if not bitmaps.get(table.id, 0) & mask]
+
+
+def bitmap_drift(date=None):
+    """Return list of (table id, date, stored bitmap, bitmap computed from reservations) which differ."""
+    reservations = Reservation.objects.all()
+    stored_slots = TableSlots.objects.all()
+    if date is not None:
+        reservations = reservations.filter(date=date)
+        stored_slots = stored_slots.filter(date=date)
+    expected = computed_bitmaps(reservations)
+    stored = {(table_id, day): from_bytes(slots)
+              for table_id, day, slots in stored_slots.values_list('table_id', 'date', 'slots')}
+    return [(table_id, day, stored.get((table_id, day), 0), expected.get((table_id, day), 0))
+            for table_id, day in sorted(set(expected) | set(stored))
+            if stored.get((table_id, day), 0) != expected.get((table_id, day), 0)]
@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.utils.dateparse import parse_time
+
+from .holds import held_by_others
+from .models import Reservation, Table, DEFAULT_DURATION, end_of_interval
+
+
+class TableUnavailable(Exception):
+    """Raised when table can't be reserved at requested date and time."""
+
+
+def book_table(user, restaurant_id, table_id, date, time, meals=(), duration=DEFAULT_DURATION):
+    """Reserve restaurant's table at date and time in one transaction. Return new reservation.
+
+    Row of the table is locked before checking for overlapping reservations, so concurrent bookings of
+    the same table are serialized and only the first of them succeeds. The others wait for the lock,
+    see the new reservation and raise TableUnavailable without retrying. Table held by other user in
+    booking wizard is unavailable too.
+    """
+    start = parse_time(time) if isinstance(time, str) else time
+    end = end_of_interval(start, duration)
+    if held_by_others(user.id, [int(table_id)], date, start, duration):
+        raise TableUnavailable('Wybrany stolik jest chwilowo zarezerwowany przez innego użytkownika.')
+    with transaction.atomic():
+        table = Table.objects.select_for_update().filter(pk=table_id, restaurant_id=restaurant_id).first()
+        if table is None:
+            raise TableUnavailable('Wybrany stolik nie istnieje.')
+        if Reservation.objects.filter(table=table, date=date, time__lt=end, end_time__gt=start).exists():
+            raise TableUnavailable('Wybrany stolik jest już zajęty. Wybierz inny stolik.')
+        reservation = Reservation.objects.create(restaurant_id=restaurant_id, table=table, date=date, time=start,
+                                                 duration=duration, user=user)
+        reservation.meal.set(meals)
+    return reservation
@@ -0,0 +1,188 @@
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+STALE_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 10
+
+
+def _version_key(restaurant_id, fragment):
+    return f'lunchtime:version:{fragment}:{restaurant_id}'
+
+
+def fragment_version(restaurant_id, fragment):
+    """Return current version of restaurant's cached fragment."""
+    key = _version_key(restaurant_id, fragment)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_fragment_version(restaurant_id, fragment):
+    """Invalidate restaurant's cached fragment by changing its version.
+
+    Version which has been evicted from cache starts again from current time, so it never matches
+    version of fragment cached before.
+    """
+    key = _version_key(restaurant_id, fragment)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+class LRUCache:
+    """Small in-process cache which keeps most recently used values for at most timeout seconds."""
+    def __init__(self, maxsize=256, timeout=60):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_set(self, key, compute):
+        """Return cached value of key. Compute and store it when it is missing or expired."""
+        now = time.monotonic()
+        with self.lock:
+            if key in self.values:
+                value, expires = self.values[key]
+                if expires > now:
+                    self.values.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            self.values[key] = (value, now + self.timeout)
+            self.values.move_to_end(key)
+            while len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+def _release(store, lock_key, token):
+    """Delete lock key unless it expired and was acquired by another caller since."""
+    if store.get(lock_key) == token:
+        store.delete(lock_key)
+
+
+def get_or_recompute(key, compute, timeout, stale_timeout=STALE_TIMEOUT, version=None, beta=1.0,
+                     lock_timeout=LOCK_TIMEOUT, store=cache):
+    """Return value cached under key, recomputing it by only one caller at a time.
+
+    Value is fresh for timeout seconds, but it is recomputed early with probability which grows towards
+    expiry and with time the last computation took, scaled by beta (0 disables early expiration).
+    Expired value is served for stale_timeout seconds more while the caller which acquired lock key
+    recomputes it. Value of other version than the given one is never served: callers wait for the lock
+    holder and compute value themselves only if it doesn't store value within lock_timeout seconds.
+    """
+    entry = store.get(key)
+    stale = entry is not None and entry[1] == version
+    if stale:
+        value, version, expires, delta = entry
+        if time.time() - delta * beta * math.log(1 - random.random()) < expires:
+            return value
+    lock_key, token = f'{key}:lock', uuid.uuid4().hex
+    acquired = store.add(lock_key, token, lock_timeout)
+    if not acquired:
+        if stale:
+            return value
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = store.get(key)
+            if entry is not None and entry[1] == version:
+                return entry[0]
+    try:
+        start = time.time()
+        value = compute()
+        now = time.time()
+        store.set(key, (value, version, now + timeout, now - start), timeout + stale_timeout)
+    finally:
+        if acquired:
+            _release(store, lock_key, token)
+    return value
+
+
+def update_cached(key, update, stale_timeout=STALE_TIMEOUT, lock_timeout=LOCK_TIMEOUT, store=cache):
+    """Replace value cached by get_or_recompute under key with update(value), holding the same lock key.
+
+    Updates wait for each other and for recomputation of value. Missing value isn't computed. Value is
+    dropped when lock can't be acquired within lock_timeout seconds, so the next reader recomputes it.
+    """
+    lock_key, token = f'{key}:lock', uuid.uuid4().hex
+    deadline = time.monotonic() + lock_timeout
+    while not store.add(lock_key, token, lock_timeout):
+        if time.monotonic() >= deadline:
+            store.delete(key)
+            return
+        time.sleep(0.01)
+    try:
+        entry = store.get(key)
+        if entry is not None:
+            value, version, expires, delta = entry
+            store.set(key, (update(value), version, expires, delta), max(expires - time.time(), 0) + stale_timeout)
+    finally:
+        _release(store, lock_key, token)
+
+
+class SnapshotCache:
+    """Snapshots of restaurants' data stored in Django cache together with version of fragment.
+
+    Changed data bumps version of fragment, so snapshot of previous version is never served. Snapshot is
+    recomputed by get_or_recompute, so expiry of snapshot of popular restaurant costs one computation.
+    Snapshots are kept in cache named by LUNCHTIME_SNAPSHOT_CACHE setting, `default` if it is missing.
+    Numbers of hits and misses are counted per process.
+    """
+    def __init__(self, fragment, timeout=FRAGMENT_TIMEOUT):
+        self.fragment = fragment
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, restaurant_id, load):
+        """Return snapshot of restaurant's fragment. Load and store it when current version is missing."""
+        loaded = []
+
+        def compute():
+            loaded.append(True)
+            return load()
+
+        snapshot = get_or_recompute(f'lunchtime:snapshot:{self.fragment}:{restaurant_id}', compute, self.timeout,
+                                    version=fragment_version(restaurant_id, self.fragment),
+                                    store=caches[getattr(settings, 'LUNCHTIME_SNAPSHOT_CACHE', 'default')])
+        with self.lock:
+            if loaded:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return snapshot
+
+    def stats(self):
+        """Return numbers of hits and misses."""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+
+menu_snapshots = SnapshotCache('menu')
+review_snapshots = SnapshotCache('reviews')
@@ -0,0 +1,238 @@
+import asyncio
+import io
+import json
+import re
+import threading
+from collections import defaultdict
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .asyncdb import run_query
+from .models import Restaurant
+
+DEFAULT_BROKER = 'lunchtime.events.local_broker'
+HEARTBEAT = 15
+RETRY = 5000
+QUEUE_SIZE = 100
+
+STREAM_PATH = re.compile(r'/events/restaurants/(?P<restaurant_id>\d+)/')
+
+
+def channel_of(restaurant_id):
+    return f'restaurant:{restaurant_id}'
+
+
+class Subscription:
+    """Queue of messages of one channel read by one coroutine.
+
+    Messages can be delivered from any thread. Subscriber which doesn't keep up with QUEUE_SIZE messages
+    is closed, so its client reconnects and reads current state again instead of missing events silently.
+    """
+    def __init__(self, channel, loop=None, maxsize=QUEUE_SIZE):
+        self.channel = channel
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def deliver(self, message):
+        """Put message into queue of subscriber. Safe to call from any thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.closed:
+            return
+        if self.queue.full():
+            self.close()
+            return
+        self.queue.put_nowait(message)
+
+    def close(self):
+        """Stop subscription. Reader gets None once it has read messages queued before."""
+        if not self.closed:
+            self.closed = True
+            while self.queue.full():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout=None):
+        """Return next message, None when subscription is closed. Raise asyncio.TimeoutError after timeout."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+    """Interface of publish/subscribe of events by channel.
+
+    Broker connecting several processes, e.g. by Redis, publishes messages to its server and delivers
+    messages received from it to local subscriptions.
+    """
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return new Subscription of channel. Must be called in event loop which reads it."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """Broker of single process. Message is delivered to subscribers of its channel only, so idle channels
+    and idle subscribers cost nothing but memory of their queues.
+    """
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        """Return number of subscriptions of channel or of all channels."""
+        with self.lock:
+            if channel is not None:
+                return len(self.subscriptions.get(channel, ()))
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+
+local_broker = LocalBroker()
+
+
+def get_broker():
+    """Return broker named by LUNCHTIME_EVENT_BROKER setting, local broker of process if it is missing."""
+    return import_string(getattr(settings, 'LUNCHTIME_EVENT_BROKER', DEFAULT_BROKER))
+
+
+def format_event(event, data):
+    """Return server-sent event of given type with data encoded as JSON."""
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+def reservation_event(reservation):
+    """Return data of reservation's event. It doesn't tell who booked the table."""
+    return {'id': reservation.id, 'table': reservation.table_id, 'date': reservation.date, 'time': reservation.time,
+            'duration': reservation.duration}
+
+
+def publish_event(restaurant_id, event, data):
+    """Publish event to subscribers of restaurant once transaction commits.
+
+    Event is encoded once and the same message is delivered to every subscriber.
+    """
+    message = format_event(event, data)
+    transaction.on_commit(lambda: get_broker().publish(channel_of(restaurant_id), message))
+
+
+def restaurant_access(scope, restaurant_id, permissions=()):
+    """Return HTTP status of access of request of ASGI scope to restaurant's data, checked as RestaurantOwnerMixin
+    does: 404 without restaurant, 403 unless user logged in by session cookie has permissions and is restaurant's
+    owner or staff, 200 otherwise.
+    """
+    request = ASGIRequest(scope, io.BytesIO())
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    user = auth.get_user(request)
+    owners = list(Restaurant.objects.filter(pk=restaurant_id).values_list('owner_id', flat=True))
+    if not owners:
+        return 404
+    if user.is_authenticated and user.has_perms(permissions) and (user.is_staff or user.id == owners[0]):
+        return 200
+    return 403
+
+
+class EventStream:
+    """ASGI application which streams server-sent events of restaurant from /events/restaurants/<id>/.
+
+    Other requests are passed to wrapped application. Django 3.1 iterates streaming responses
+    synchronously, so stream is served by plain ASGI. Only restaurant's owner and staff may listen.
+    Connected client costs queries of one check of its session and restaurant, and then only waits
+    for events, with comment sent every HEARTBEAT seconds to keep connection open through proxies.
+    """
+    def __init__(self, application, heartbeat=HEARTBEAT):
+        self.application = application
+        self.heartbeat = heartbeat
+
+    async def __call__(self, scope, receive, send):
+        match = STREAM_PATH.fullmatch(scope['path']) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.application(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self.respond(send, 405, b'Method Not Allowed', [(b'Allow', b'GET')])
+        restaurant_id = int(match['restaurant_id'])
+        status = await run_query(restaurant_access, scope, restaurant_id)
+        if status == 404:
+            return await self.respond(send, 404, 'Nie ma takiej restauracji.'.encode())
+        if status == 403:
+            return await self.respond(send, 403, 'Brak dostępu.'.encode())
+        broker = get_broker()
+        subscription = broker.subscribe(channel_of(restaurant_id))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'Content-Type', b'text/event-stream; charset=utf-8'), (b'Cache-Control', b'no-cache'),
+                (b'X-Accel-Buffering', b'no')]})
+            await self.send_body(send, f'retry: {RETRY}\n\n')
+            await self.stream(subscription, receive, send)
+        finally:
+            broker.unsubscribe(subscription)
+
+    async def stream(self, subscription, receive, send):
+        """Send messages of subscription until client disconnects or subscription is closed."""
+        disconnect = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        message = None
+        try:
+            while True:
+                message = message or asyncio.ensure_future(subscription.get())
+                done, pending = await asyncio.wait({message, disconnect}, timeout=self.heartbeat,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    return
+                if message not in done:
+                    await self.send_body(send, ': keep-alive\n\n')
+                    continue
+                text, message = message.result(), None
+                if text is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+                await self.send_body(send, text)
+        finally:
+            disconnect.cancel()
+            if message is not None:
+                message.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def send_body(send, text):
+        await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+    @staticmethod
+    async def respond(send, status, body, headers=()):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'Content-Type', b'text/plain; charset=utf-8'), *headers]})
+        await send({'type': 'http.response.body', 'body': body})
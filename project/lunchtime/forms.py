@@ -1,7 +1,8 @@
 import datetime
 from django import forms
 from django.contrib.auth.models import User
-from .models import Restaurant, Meal, Reservation, Review, Table
+from .models import Restaurant, Meal, Reservation, Review, Table, OPENS_AT, CLOSES_AT, MAX_PERSONS
+from .widgets import RestaurantAutocompleteWidget
 
 
 class AddUserForm(forms.Form):
@@ -40,14 +41,35 @@ class LoginForm(forms.Form):
 
 class AddRestaurantForm(forms.ModelForm):
     """Add new restaurant to database."""
+    opens_at = forms.TimeField(label='otwarte od', required=False)
+    closes_at = forms.TimeField(label='otwarte do', required=False)
+
     class Meta:
         model = Restaurant
-        fields = ['name', 'address', 'phone', 'email', 'description', 'logo']
+        fields = ['name', 'address', 'phone', 'email', 'description', 'logo', 'opens_at', 'closes_at']
+
+    def clean_opens_at(self):
+        """Return opening time. Return default opening time if it is not given."""
+        return self.cleaned_data.get('opens_at') or OPENS_AT
+
+    def clean_closes_at(self):
+        """Return closing time. Return default closing time if it is not given."""
+        return self.cleaned_data.get('closes_at') or CLOSES_AT
+
+
+class RestaurantFilterForm(forms.Form):
+    """Filter and sort list of restaurants."""
+    open_now = forms.BooleanField(label='otwarte teraz', required=False)
+    min_rating = forms.IntegerField(label='minimalna ocena', min_value=1, max_value=5, required=False)
+    min_price = forms.DecimalField(label='cena od', min_value=0, max_digits=5, decimal_places=2, required=False)
+    max_price = forms.DecimalField(label='cena do', min_value=0, max_digits=5, decimal_places=2, required=False)
+    sort = forms.ChoiceField(label='sortuj', choices=(('name', 'nazwa'), ('rating', 'ocena')), required=False)
 
 
 class AddTableForm(forms.ModelForm):
     """Add new table to database."""
-    restaurant = forms.ModelChoiceField(Restaurant.objects.all(), label='restauracja')
+    restaurant = forms.ModelChoiceField(Restaurant.objects.all(), label='restauracja',
+                                        widget=RestaurantAutocompleteWidget)
     persons = forms.IntegerField(label='ilość osób przy stoliku', min_value=1)
 
     class Meta:
@@ -60,15 +82,44 @@ class AddMealForm(forms.ModelForm):
     class Meta:
         model = Meal
         fields = ['restaurant', 'category', 'name', 'description', 'price']
+        widgets = {'restaurant': RestaurantAutocompleteWidget}
+
+
+class MealRowForm(forms.ModelForm):
+    """Validate meal of restaurant's menu read from imported file."""
+    class Meta:
+        model = Meal
+        fields = ['category', 'name', 'description', 'price']
+
+
+class MenuImportForm(forms.Form):
+    """Upload CSV or JSON file with meals of restaurant's menu."""
+    file = forms.FileField(label='plik CSV lub JSON')
+
+    def clean_file(self):
+        """Check extension of uploaded file. Return file."""
+        file = self.cleaned_data.get('file')
+        if file and not file.name.lower().endswith(('.csv', '.json')):
+            raise forms.ValidationError('Plik musi mieć rozszerzenie .csv lub .json.')
+        return file
 
 
 class SelectRestaurantForm(forms.Form):
     """Select restaurant for reservation."""
-    restaurant = forms.ModelChoiceField(Restaurant.objects.all(), label='Restauracja')
+    restaurant = forms.ModelChoiceField(Restaurant.objects.all(), label='Restauracja',
+                                        widget=RestaurantAutocompleteWidget)
+
+    def __init__(self, *args, restaurants=None, **kwargs):
+        """Allow to choose only from given restaurants, e.g. these with free tables."""
+        super().__init__(*args, **kwargs)
+        if restaurants is not None:
+            self.fields['restaurant'].queryset = restaurants
 
 
 class SelectDateAndTimeForm(forms.ModelForm):
-    """Select date and time of reservation."""
+    """Select date and time of reservation and number of persons."""
+    persons = forms.IntegerField(label='liczba osób', min_value=1, max_value=MAX_PERSONS, initial=2, required=False)
+
     class Meta:
         model = Reservation
         fields = ['date', 'time']
@@ -87,4 +138,5 @@ class AddReviewForm(forms.ModelForm):
     class Meta:
         model = Review
         fields = ['restaurant', 'rate', 'review']
+        widgets = {'restaurant': RestaurantAutocompleteWidget}
 
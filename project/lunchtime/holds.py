@@ -0,0 +1,72 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .bitmaps import slot_range
+from .models import TableHold, DEFAULT_DURATION, end_of_interval
+
+HOLD_TIMEOUT = 5 * 60
+SWEEP_BATCH_SIZE = 1000
+
+
+def _slots(time, duration):
+    """Return range of slots of interval which begins at time and lasts duration minutes."""
+    if isinstance(time, str):
+        time = datetime.time.fromisoformat(time)
+    return slot_range(time, end_of_interval(time, duration))
+
+
+def active_holds(date, time, duration=DEFAULT_DURATION):
+    """Return queryset of holds which haven't expired yet, of slots which interval touches."""
+    slots = _slots(time, duration)
+    return TableHold.objects.filter(date=date, slot__gte=slots.start, slot__lt=slots.stop,
+                                    expires_at__gt=timezone.now())
+
+
+def hold_table(user_id, table_id, date, time, duration=DEFAULT_DURATION, timeout=HOLD_TIMEOUT):
+    """Hold table for user for timeout seconds. Return False when other user holds any of its slots.
+
+    Every slot is a row unique per table, day and slot, so holds of overlapping intervals conflict on
+    insert, while holds of other tables or hours never wait for each other and no row of table is locked.
+    Expired holds of the same slots and user's own ones are replaced.
+    """
+    slots = _slots(time, duration)
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            TableHold.objects.filter(table_id=table_id, date=date, slot__in=slots) \
+                .filter(Q(expires_at__lte=now) | Q(user_id=user_id)).delete()
+            TableHold.objects.bulk_create([
+                TableHold(table_id=table_id, date=date, slot=slot, user_id=user_id,
+                          expires_at=now + datetime.timedelta(seconds=timeout)) for slot in slots])
+    except IntegrityError:
+        return False
+    return True
+
+
+def release_table(user_id, table_id, date, time, duration=DEFAULT_DURATION):
+    """Remove user's hold of table."""
+    TableHold.objects.filter(table_id=table_id, date=date, slot__in=_slots(time, duration), user_id=user_id).delete()
+
+
+def held_by_others(user_id, table_ids, date, time, duration=DEFAULT_DURATION):
+    """Return set of ids of tables any slot of which other user holds at date and time."""
+    return set(active_holds(date, time, duration).filter(table_id__in=table_ids).exclude(user_id=user_id)
+               .values_list('table_id', flat=True))
+
+
+def sweep_expired_holds(batch_size=SWEEP_BATCH_SIZE):
+    """Delete expired holds in batches of given size. Return number of deleted holds.
+
+    Every batch is deleted by primary keys in its own short transaction, so sweeping never locks many
+    rows at once and doesn't block holds of tables in use.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(TableHold.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += TableHold.objects.filter(id__in=ids, expires_at__lte=now).delete()[0]
@@ -0,0 +1,107 @@
+import hashlib
+import io
+import json
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {'list': (300, 300), 'page': (400, 400)}
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpeg': ('JPEG', {'quality': 85, 'optimize': True})}
+RENDITIONS_DIR = 'renditions'
+WORKERS = 2
+
+# Renditions are named after image, which is named by hash of its content, and by hash of their size and format
+# options, so they are stored as they are named and changed settings make renditions of new names.
+rendition_storage = FileSystemStorage()
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='renditions')
+_pending = set()
+_lock = threading.Lock()
+
+
+def rendition_spec(rendition, extension):
+    """Return short hash of size and format options of rendition."""
+    spec = json.dumps([RENDITIONS[rendition], FORMATS[extension]], sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:8]
+
+
+def rendition_name(name, rendition, extension):
+    """Return name of stored rendition of image, e.g. renditions/media/logo.list.1a2b3c4d.webp."""
+    root, _ = posixpath.splitext(name.lstrip('/'))
+    return posixpath.join(RENDITIONS_DIR, f'{root}.{rendition}.{rendition_spec(rendition, extension)}.{extension}')
+
+
+def rendition_url(name, rendition, extension):
+    """Return URL of rendition of image, or of the image itself when rendition hasn't been made yet."""
+    renditioned = rendition_name(name, rendition, extension)
+    if rendition_storage.exists(renditioned):
+        return rendition_storage.url(renditioned)
+    return default_storage.url(name)
+
+
+def make_renditions(name):
+    """Store renditions of image of every size in every format. Return their names.
+
+    Image is decoded once, JPEG at reduced scale right away, and scaled down with the same aspect ratio
+    after rotating it by its EXIF orientation. Transparent images get white background in JPEG.
+    """
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.draft('RGB', max(RENDITIONS.values()))
+        image = ImageOps.exif_transpose(image)
+    names = []
+    for rendition, size in RENDITIONS.items():
+        scaled = image.copy()
+        scaled.thumbnail(size, Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            if image_format == 'JPEG' and scaled.mode != 'RGB':
+                background = Image.new('RGB', scaled.size, 'white')
+                background.paste(scaled, mask=scaled.convert('RGBA').getchannel('A'))
+                converted = background
+            else:
+                converted = scaled
+            output = io.BytesIO()
+            converted.save(output, image_format, **options)
+            renditioned = rendition_name(name, rendition, extension)
+            rendition_storage.delete(renditioned)
+            names.append(rendition_storage.save(renditioned, ContentFile(output.getvalue())))
+    return names
+
+
+def _make_renditions(name):
+    try:
+        return make_renditions(name)
+    except Exception:
+        logger.exception('Making renditions of %s failed', name)
+        raise
+
+
+def _submit(name):
+    future = _executor.submit(_make_renditions, name)
+    with _lock:
+        _pending.add(future)
+    future.add_done_callback(_discard)
+
+
+def _discard(future):
+    with _lock:
+        _pending.discard(future)
+
+
+def schedule_renditions(name):
+    """Make renditions of stored image in worker pool, off the request thread, once transaction commits."""
+    transaction.on_commit(lambda: _submit(name))
+
+
+def wait_for_renditions(timeout=None):
+    """Wait until scheduled renditions are made."""
+    with _lock:
+        pending = list(_pending)
+    wait(pending, timeout)
@@ -0,0 +1,87 @@
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+
+from .bitmaps import SLOT_MINUTES
+from .cache import get_or_recompute, update_cached
+from .models import Meal, Reservation
+
+QUEUE_TIMEOUT = 60
+
+
+def _queue_key(restaurant_id, date):
+    return f'lunchtime:kitchen:{restaurant_id}:{date}'
+
+
+def slot_of(time):
+    """Return index of 15-minute slot which time falls into."""
+    if isinstance(time, str):
+        time = datetime.time.fromisoformat(time)
+    return (time.hour * 60 + time.minute) // SLOT_MINUTES
+
+
+def computed_queue(restaurant_id, date):
+    """Return numbers of meals ordered with restaurant's reservations on given day, by slot and meal.
+
+    Meals are counted from one query over reservation's meals. It reads a row per meal of reservation
+    instead of counts grouped by slot and meal, at most a few thousand rows of one restaurant's day read
+    once per QUEUE_TIMEOUT, because change_queue needs to know which of them the queue counts. Return
+    dictionary with `counts` of (slot, meal id), `names` of meals and slots of `covered` pairs of
+    (reservation id, meal id).
+    """
+    rows = Reservation.meal.through.objects \
+        .filter(reservation__restaurant_id=restaurant_id, reservation__date=date) \
+        .values_list('reservation_id', 'reservation__time', 'meal_id', 'meal__name')
+    queue = {'counts': defaultdict(int), 'names': {}, 'covered': {}}
+    for reservation_id, time, meal_id, name in rows:
+        queue['counts'][slot_of(time), meal_id] += 1
+        queue['names'][meal_id] = name
+        queue['covered'][reservation_id, meal_id] = slot_of(time)
+    return queue
+
+
+def prep_queue(restaurant_id, date, since=None):
+    """Return list of slots from the one of since time on, with meals to serve in them and their counts.
+
+    Queue of restaurant's day is cached and kept up to date by every booked or cancelled reservation, and
+    computed again by one request at a time after QUEUE_TIMEOUT seconds in case any change was missed.
+    """
+    queue = get_or_recompute(_queue_key(restaurant_id, date), lambda: computed_queue(restaurant_id, date),
+                             QUEUE_TIMEOUT, stale_timeout=QUEUE_TIMEOUT)
+    first = slot_of(since) if since else 0
+    slots = defaultdict(list)
+    for (slot, meal_id), count in queue['counts'].items():
+        if slot >= first and count > 0:
+            slots[slot].append({'id': meal_id, 'name': queue['names'][meal_id], 'count': count})
+    return [{'time': (datetime.datetime.min + datetime.timedelta(minutes=slot * SLOT_MINUTES)).strftime('%H:%M'),
+             'meals': sorted(meals, key=lambda meal: (-meal['count'], meal['name']))}
+            for slot, meals in sorted(slots.items())]
+
+
+def change_queue(reservation, meal_ids, sign):
+    """Add (sign 1) or remove (sign -1) meals of reservation to/from cached queue once transaction commits.
+
+    Meal which queue already counts is removed from the slot where it is counted first, so adding it again
+    moves it to reservation's slot and changes which queue computed after transaction committed already
+    includes are counted once. Names of meals are read only when queue is cached and doesn't know them yet.
+    """
+    key = _queue_key(reservation.restaurant_id, reservation.date)
+    slot = slot_of(reservation.time)
+    reservation_id = reservation.id
+
+    def update(queue):
+        missing = [meal_id for meal_id in meal_ids if meal_id not in queue['names']]
+        if missing:
+            queue['names'].update(Meal.objects.filter(pk__in=missing).values_list('id', 'name'))
+        for meal_id in meal_ids:
+            counted = queue['covered'].pop((reservation_id, meal_id), None)
+            if counted is not None:
+                queue['counts'][counted, meal_id] -= 1
+            if sign > 0:
+                queue['covered'][reservation_id, meal_id] = slot
+                queue['counts'][slot, meal_id] += 1
+        return queue
+
+    if meal_ids:
+        transaction.on_commit(lambda: update_cached(key, update, stale_timeout=QUEUE_TIMEOUT))
@@ -0,0 +1,41 @@
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from lunchtime.benchmark import api_paths, run_asgi_load, run_wsgi_load, API_STEPS
+from lunchtime.seeding import SCALES, USERNAME_PREFIX
+
+
+class Command(BaseCommand):
+    """Compare throughput of JSON endpoints served by WSGI handler in threads and by ASGI handler in event loop.
+
+    Both handlers get the same list of requests. Run it against a scratch database, because synthetic data
+    is generated when there is none.
+    """
+    help = 'Benchmark JSON endpoints under WSGI and ASGI with concurrent clients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small', help='size of generated data')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16, help='number of concurrent clients')
+        parser.add_argument('--seed', type=int, default=0)
+
+    @override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('Number of requests and concurrency have to be positive.')
+        if not User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            call_command('seed_lunchtime', scale=options['scale'], seed=options['seed'], stdout=self.stdout)
+        paths = api_paths(options['requests'], options['seed'])
+        for name, result in (('WSGI', run_wsgi_load(paths, options['concurrency'])),
+                             ('ASGI', asyncio.run(run_asgi_load(paths, options['concurrency'])))):
+            self.stdout.write(f'{name}: {result.requests() / result.elapsed:.1f} requests/s, '
+                              f'{len(result.errors)} errors in {result.elapsed:.1f} s')
+            for line in result.latency_lines(API_STEPS):
+                self.stdout.write(f'  {line}')
+            for error in result.errors[:5]:
+                self.stderr.write(f'  {error}')
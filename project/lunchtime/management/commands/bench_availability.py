@@ -0,0 +1,68 @@
+import datetime
+import random
+import time as timer
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lunchtime import bitmaps
+from lunchtime.availability import free_tables
+from lunchtime.models import Restaurant, Table, Reservation, DEFAULT_DURATION, end_of_interval
+
+
+class Command(BaseCommand):
+    """Measure time of free tables lookup while number of historical reservations grows.
+
+    Lookup by SQL query over reservations is compared with lookup by bitmaps of occupied slots.
+    All data is created inside transaction which is rolled back at the end.
+    """
+    help = 'Benchmark free tables lookup against growing number of reservations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='numbers of historical reservations to measure at')
+        parser.add_argument('--tables', type=int, default=20, help='number of tables in restaurant')
+        parser.add_argument('--repeat', type=int, default=50, help='number of lookups per step')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            owner = User.objects.create_user(username='bench_availability')
+            restaurant = Restaurant.objects.create(name='Benchmark', address='-', phone='-',
+                                                   email='bench@example.com', description='-', owner=owner)
+            tables = [Table.objects.create(restaurant=restaurant, persons=random.randint(2, 8))
+                      for _ in range(options['tables'])]
+            day = datetime.date.today()
+            for table in tables[::2]:
+                Reservation.objects.create(restaurant=restaurant, table=table, user=owner, date=day,
+                                           time=datetime.time(random.randint(8, 19), 0))
+            created = 0
+            for step in sorted(options['steps']):
+                self.create_history(restaurant, tables, owner, day, step - created, options['batch_size'])
+                created = step
+                sql = self.measure(free_tables, restaurant, day, options['repeat'])
+                bitmap = self.measure(bitmaps.free_tables, restaurant, day, options['repeat'])
+                self.stdout.write(f'{step:>10} reservations: SQL {sql * 1000:.3f} ms, '
+                                  f'bitmaps {bitmap * 1000:.3f} ms per lookup')
+            self.stdout.write(str(free_tables(restaurant.id, day, datetime.time(12, 0)).explain()))
+            transaction.set_rollback(True)
+
+    def create_history(self, restaurant, tables, user, day, count, batch_size):
+        """Create count reservations on days before given day."""
+        while count > 0:
+            batch = []
+            for _ in range(min(batch_size, count)):
+                start = datetime.time(random.randint(8, 20), random.choice((0, 15, 30, 45)))
+                batch.append(Reservation(restaurant=restaurant, table=random.choice(tables), user=user,
+                                         date=day - datetime.timedelta(days=random.randint(1, 3650)), time=start,
+                                         duration=DEFAULT_DURATION, end_time=end_of_interval(start, DEFAULT_DURATION)))
+            Reservation.objects.bulk_create(batch)
+            count -= len(batch)
+
+    def measure(self, lookup, restaurant, day, repeat):
+        """Return average time of free tables lookup at given day."""
+        start = timer.perf_counter()
+        for i in range(repeat):
+            list(lookup(restaurant.id, day, datetime.time(8 + i % 12, 30), persons=2))
+        return (timer.perf_counter() - start) / repeat
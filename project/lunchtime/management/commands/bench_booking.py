@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from lunchtime.benchmark import run_load
+from lunchtime.seeding import SCALES, USERNAME_PREFIX
+
+
+class Command(BaseCommand):
+    """Load test reservation path select_date_time -> select_restaurant -> add_reservation -> reservation_list.
+
+    Synthetic data is generated once from seed and kept, so run the command against a scratch database,
+    e.g. with --settings pointing at local SQLite or PostgreSQL, and compare reports between changes.
+    """
+    help = 'Benchmark booking flow with concurrent synthetic users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small', help='size of generated data')
+        parser.add_argument('--scenarios', type=int, default=200, help='number of booking scenarios to run')
+        parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent users')
+        parser.add_argument('--seed', type=int, default=0)
+
+    @override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['scenarios'] < 1:
+            raise CommandError('Number of scenarios and concurrency have to be positive.')
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            self.stdout.write('Using previously generated data.')
+        else:
+            call_command('seed_lunchtime', scale=options['scale'], seed=options['seed'], stdout=self.stdout)
+        result = run_load(options['scenarios'], options['concurrency'], options['seed'])
+        for line in result.report():
+            self.stdout.write(line)
+        for error in result.errors[:10]:
+            self.stderr.write(str(error))
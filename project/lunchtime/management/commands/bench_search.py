@@ -0,0 +1,52 @@
+import random
+import statistics
+import time as timer
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lunchtime.models import Restaurant, Meal
+from lunchtime.search import rebuild_index, search
+from lunchtime.seeding import DISHES, ADDITIONS
+
+QUERIES = ['pieczen', 'śniadanie', 'pierogi z kapusta', 'zure', 'losos z rusztu', 'gołąbki po góralsku']
+
+
+class Command(BaseCommand):
+    """Measure latency of search over many meals. Data is created in transaction which is rolled back."""
+    help = 'Benchmark full text search of restaurants and meals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meals', type=int, default=1000000)
+        parser.add_argument('--restaurants', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=200, help='number of searches')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            owner = User.objects.create_user(username='bench_search')
+            restaurants = [Restaurant.objects.create(name=f'Restauracja {number}', address='Rynek Główny 1',
+                                                     phone='-', email='bench@example.com',
+                                                     description='Kuchnia polska', owner=owner)
+                           for number in range(options['restaurants'])]
+            count = options['meals']
+            while count > 0:
+                batch = [Meal(restaurant=random.choice(restaurants), category=random.randint(1, 3),
+                              name=f'{random.choice(DISHES)} {random.choice(ADDITIONS)}',
+                              description=f'{random.choice(DISHES)} {random.choice(ADDITIONS)}', price=25)
+                         for _ in range(min(options['batch_size'], count))]
+                Meal.objects.bulk_create(batch)
+                count -= len(batch)
+            start = timer.perf_counter()
+            documents = rebuild_index(options['batch_size'])
+            self.stdout.write(f'Indexed {documents} documents in {timer.perf_counter() - start:.1f} s')
+            latencies = []
+            for number in range(options['repeat']):
+                start = timer.perf_counter()
+                search(QUERIES[number % len(QUERIES)])
+                latencies.append((timer.perf_counter() - start) * 1000)
+            percentiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(f'p50 {percentiles[49]:.2f} ms, p95 {percentiles[94]:.2f} ms, '
+                              f'p99 {percentiles[98]:.2f} ms')
+            transaction.set_rollback(True)
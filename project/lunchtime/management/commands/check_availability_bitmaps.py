@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from lunchtime.bitmaps import bitmap_drift, rebuild_table_day
+from lunchtime.models import Table
+
+
+class Command(BaseCommand):
+    """Compare bitmaps of occupied slots with reservations and optionally rebuild the ones that differ."""
+    help = 'Check availability bitmaps against reservations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='check only given day (YYYY-MM-DD)')
+        parser.add_argument('--fix', action='store_true', help='rebuild bitmaps which differ')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = bitmap_drift(options['date'])
+            for table_id, date, stored, expected in drift:
+                self.stdout.write(f'table {table_id}, {date}: stored {stored:024x}, expected {expected:024x}')
+            if not options['fix']:
+                if drift:
+                    raise CommandError(f'{len(drift)} bitmaps differ from reservations.')
+                self.stdout.write('Bitmaps are consistent with reservations.')
+                return
+            restaurants = dict(Table.objects.filter(id__in={table_id for table_id, *rest in drift})
+                               .values_list('id', 'restaurant_id'))
+            for table_id, date, stored, expected in drift:
+                rebuild_table_day(table_id, restaurants[table_id], date)
+        self.stdout.write(f'Rebuilt {len(drift)} bitmaps.')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from lunchtime.images import make_renditions
+from lunchtime.models import Restaurant
+
+
+class Command(BaseCommand):
+    """Make renditions of logos uploaded before renditions were introduced or after their sizes changed."""
+    help = 'Make WebP and JPEG renditions of all restaurant logos.'
+
+    def handle(self, *args, **options):
+        count = 0
+        for name in Restaurant.objects.exclude(logo='').exclude(logo=None).values_list('logo', flat=True).iterator():
+            try:
+                make_renditions(name)
+                count += 1
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(f'Made renditions of {count} logos.')
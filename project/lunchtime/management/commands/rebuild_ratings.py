@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Now
+
+from lunchtime.models import Restaurant
+from lunchtime.ratings import rating_drift
+
+
+class Command(BaseCommand):
+    """Compare restaurants' ratings with their reviews and rebuild the ones that drifted."""
+    help = 'Rebuild restaurant rating aggregates from reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='only report drift, exit with error if found')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = rating_drift()
+            for restaurant, expected in drift:
+                self.stdout.write(f'{restaurant.name} (id {restaurant.id}): '
+                                  f'{restaurant.review_count} reviews stored, {expected["review_count"]} counted')
+            if options['check']:
+                if drift:
+                    raise CommandError(f'Rating of {len(drift)} restaurants drifted.')
+                return
+            for restaurant, expected in drift:
+                Restaurant.objects.filter(pk=restaurant.id).update(**expected, updated_at=Now())
+        self.stdout.write(f'Rebuilt rating of {len(drift)} restaurants.')
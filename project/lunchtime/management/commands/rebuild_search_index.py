@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lunchtime.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Store search documents of all restaurants and meals again, e.g. after bulk import."""
+    help = 'Rebuild full text search index of restaurants and meals.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_index()
+        self.stdout.write(f'Indexed {count} documents.')
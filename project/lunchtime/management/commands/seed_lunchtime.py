@@ -0,0 +1,32 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from lunchtime.seeding import seed_database, SCALES, USERNAME_PREFIX
+
+
+class Command(BaseCommand):
+    """Fill database with synthetic data of given scale by batched bulk inserts and report their throughput."""
+    help = 'Generate restaurants, tables, meals, reviews and reservations for performance testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small', help='preset numbers of rows')
+        parser.add_argument('--restaurants', type=int)
+        parser.add_argument('--tables', type=int, help='number of tables per restaurant')
+        parser.add_argument('--meals', type=int, help='number of meals per restaurant')
+        parser.add_argument('--reviews', type=int, help='number of reviews per restaurant')
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--days', type=int, help='number of days of past reservations')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError(f'Database already contains generated users ({USERNAME_PREFIX}*).')
+        sizes = dict(SCALES[options['scale']])
+        sizes.update({name: options[name] for name in sizes if options[name] is not None})
+        result = seed_database(seed=options['seed'], batch_size=options['batch_size'], **sizes)
+        for name, rows in result.rows.items():
+            self.stdout.write(f'{name:<20} {rows:>10} rows in {result.seconds[name]:8.1f} s, '
+                              f'{result.rows_per_second(name):10.0f} rows/s')
+        self.stdout.write(f'{"total":<20} {sum(result.rows.values()):>10} rows in '
+                          f'{sum(result.seconds.values()):8.1f} s, {result.rows_per_second():10.0f} rows/s')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from lunchtime.holds import sweep_expired_holds, SWEEP_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Delete expired holds of tables, once or periodically, e.g. from cron or as a long-running worker."""
+    help = 'Delete expired table holds in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='holds deleted per query')
+        parser.add_argument('--every', type=float, help='repeat sweeping every given number of seconds')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or (options['every'] is not None and options['every'] <= 0):
+            raise CommandError('Batch size and interval have to be positive.')
+        while True:
+            self.stdout.write(f'Deleted {sweep_expired_holds(options["batch_size"])} expired holds.')
+            if options['every'] is None:
+                return
+            time.sleep(options['every'])
+            close_old_connections()
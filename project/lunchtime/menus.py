@@ -0,0 +1,282 @@
+import codecs
+import csv
+import itertools
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from .asyncdb import run_query
+from .cache import bump_fragment_version
+from .events import publish_event, restaurant_access
+from .forms import MealRowForm
+from .models import Meal, CATEGORIES
+from .pagination import after
+from .search import index_meals
+
+COLUMNS = ('id', 'category', 'name', 'description', 'price')
+REQUIRED_COLUMNS = ('category', 'name', 'description', 'price')
+EXPORT_ORDERING = ('category', 'name', 'id')
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'json': 'application/json'}
+CHUNK_SIZE = 500
+READ_SIZE = 64 * 1024
+MAX_ERRORS = 100
+
+_whitespace = re.compile(r'\s*')
+
+EXPORT_PATH = re.compile(r'/export_menu/(?P<restaurant_id>\d+)/')
+
+
+class MenuFormatError(ValueError):
+    """Raised when imported file can't be read as CSV or JSON list of meals."""
+
+
+class ImportResult:
+    """Numbers of created and updated meals and errors of rows, at most MAX_ERRORS of them."""
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((number, message))
+
+
+def read_csv_rows(file):
+    """Yield dictionaries of rows of CSV file with header, read line by line."""
+    reader = csv.DictReader(codecs.getreader('utf-8-sig')(file))
+    try:
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise MenuFormatError(f'Brak kolumn: {", ".join(missing)}.')
+        yield from reader
+    except (UnicodeError, csv.Error):
+        raise MenuFormatError('Niepoprawny plik CSV.')
+
+
+def read_json_rows(file):
+    """Yield items of JSON list read from file in pieces of READ_SIZE characters.
+
+    Only the item being decoded and the rest of the last piece are kept in memory.
+    """
+    reader = codecs.getreader('utf-8-sig')(file)
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+
+    def read_more():
+        nonlocal buffer, position
+        try:
+            piece = reader.read(READ_SIZE)
+        except UnicodeError:
+            raise MenuFormatError('Niepoprawny plik JSON.')
+        buffer, position = buffer[position:] + piece, 0
+        return bool(piece)
+
+    def next_character():
+        nonlocal position
+        while True:
+            position = _whitespace.match(buffer, position).end()
+            if position < len(buffer) or not read_more():
+                return buffer[position:position + 1]
+
+    if next_character() != '[':
+        raise MenuFormatError('Plik JSON musi zawierać listę posiłków.')
+    position += 1
+    if next_character() == ']':
+        return
+    while True:
+        next_character()
+        while True:
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise MenuFormatError('Niepoprawny plik JSON.')
+        yield item
+        separator = next_character()
+        position += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise MenuFormatError('Niepoprawny plik JSON.')
+
+
+def meal_from_row(restaurant_id, row):
+    """Return unsaved meal of restaurant built from validated row. Raise ValueError with message of errors."""
+    if not isinstance(row, dict):
+        raise ValueError('Wiersz musi być obiektem.')
+    data = {column: row.get(column) for column in COLUMNS}
+    categories = {name: category for category, name in CATEGORIES}
+    data['category'] = categories.get(data['category'], data['category'])
+    form = MealRowForm(data)
+    if not form.is_valid():
+        raise ValueError(' '.join(f'{form.fields[field].label}: {" ".join(messages)}'
+                                  for field, messages in form.errors.items()))
+    meal = form.save(commit=False)
+    meal.restaurant_id = restaurant_id
+    if data['id'] not in (None, ''):
+        try:
+            meal.id = int(data['id'])
+        except (TypeError, ValueError):
+            raise ValueError('id: Niepoprawny identyfikator posiłku.')
+    return meal
+
+
+def save_chunk(restaurant_id, rows, result, seen_ids):
+    """Validate chunk of numbered rows and save its meals, unless any row of import failed so far.
+
+    Meals with id of existing meal of restaurant are updated, meals without id are created.
+    """
+    meals = []
+    for number, row in rows:
+        try:
+            meal = meal_from_row(restaurant_id, row)
+        except ValueError as error:
+            result.add_error(number, str(error))
+            continue
+        if meal.id is not None:
+            if meal.id in seen_ids:
+                result.add_error(number, f'id: Posiłek {meal.id} powtarza się w pliku.')
+                continue
+            seen_ids.add(meal.id)
+        meals.append((number, meal))
+    ids = [meal.id for number, meal in meals if meal.id is not None]
+    existing = set(Meal.objects.filter(restaurant_id=restaurant_id, pk__in=ids).values_list('id', flat=True))
+    for number, meal in meals:
+        if meal.id is not None and meal.id not in existing:
+            result.add_error(number, f'id: Restauracja nie ma posiłku {meal.id}.')
+    if result.error_count:
+        return
+    new = [meal for number, meal in meals if meal.id is None]
+    changed = [meal for number, meal in meals if meal.id is not None]
+    result.created += len(new)
+    result.updated += len(changed)
+    Meal.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+    if new and new[0].pk is None:
+        # Databases which don't return ids of inserted rows, e.g. SQLite: new meals are the ones without document.
+        new = list(Meal.objects.filter(restaurant_id=restaurant_id, searchdocument=None))
+    now = timezone.now()
+    for meal in changed:
+        meal.updated_at = now
+    Meal.objects.bulk_update(changed, ['category', 'name', 'description', 'price', 'updated_at'])
+    index_meals(new + changed)
+
+
+def import_menu(restaurant_id, rows, chunk_size=CHUNK_SIZE):
+    """Create and update meals of restaurant from rows in one transaction. Return ImportResult.
+
+    Rows are validated and saved in chunks, so only one chunk is kept in memory. Import with any invalid
+    row is rolled back, but the rest of rows is still validated to report all errors at once. Bulk queries
+    don't send signals, so menu is invalidated, indexed and announced here.
+    """
+    result = ImportResult()
+    seen_ids = set()
+    numbered = enumerate(rows, 1)
+    with transaction.atomic():
+        for chunk in iter(lambda: list(itertools.islice(numbered, chunk_size)), []):
+            save_chunk(restaurant_id, chunk, result, seen_ids)
+        if result.error_count:
+            transaction.set_rollback(True)
+            result.created = result.updated = 0
+        elif result.created or result.updated:
+            bump_fragment_version(restaurant_id, 'menu')
+            publish_event(restaurant_id, 'menu-changed', {'meal': None})
+    return result
+
+
+class Echo:
+    """File-like object which returns what is written to it, for csv.writer of streamed response."""
+    def write(self, value):
+        return value
+
+
+def menu_rows(restaurant_id, last=None, chunk_size=CHUNK_SIZE):
+    """Return list of at most chunk_size rows of restaurant's meals which follow row `last` in export order.
+
+    Every chunk is read by its own query which seeks to the end of previous chunk, so chunks can be read
+    by separate calls, e.g. outside event loop one by one.
+    """
+    meals = Meal.objects.filter(restaurant_id=restaurant_id).order_by(*EXPORT_ORDERING)
+    if last is not None:
+        values = dict(zip(COLUMNS, last))
+        meals = meals.filter(after(EXPORT_ORDERING, [values[field] for field in EXPORT_ORDERING]))
+    return list(meals.values_list(*COLUMNS)[:chunk_size])
+
+
+class MenuWriter:
+    """Formats chunks of rows from menu_rows as CSV or JSON text, which can be imported back by import_menu."""
+    def __init__(self, format):
+        self.format = format
+        self.writer = csv.writer(Echo())
+        self.separator = '\n'
+
+    def start(self):
+        return self.writer.writerow(COLUMNS) if self.format == 'csv' else '['
+
+    def rows(self, rows):
+        if self.format == 'csv':
+            return ''.join(self.writer.writerow(row) for row in rows)
+        pieces = []
+        for row in rows:
+            pieces += [self.separator, json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder, ensure_ascii=False)]
+            self.separator = ',\n'
+        return ''.join(pieces)
+
+    def end(self):
+        return '' if self.format == 'csv' else '\n]\n'
+
+
+def export_menu(restaurant_id, format='csv', chunk_size=CHUNK_SIZE):
+    """Yield restaurant's menu as CSV or JSON text in pieces of chunk_size meals, so the whole menu is never
+    in memory. Output can be imported back by import_menu.
+    """
+    writer = MenuWriter(format)
+    yield writer.start()
+    rows = menu_rows(restaurant_id, chunk_size=chunk_size)
+    while rows:
+        yield writer.rows(rows)
+        rows = menu_rows(restaurant_id, rows[-1], chunk_size) if len(rows) == chunk_size else []
+    yield writer.end()
+
+
+class MenuExportStream:
+    """ASGI application which streams restaurant's menu from /export_menu/<id>/ as ExportMenuView does.
+
+    Django 3.1 iterates streaming responses synchronously in event loop, where queries aren't allowed, so
+    export is served by plain ASGI and every chunk of meals is read by run_query. Other requests, and requests
+    which ExportMenuView would refuse, are passed to wrapped application.
+    """
+    def __init__(self, application, chunk_size=CHUNK_SIZE):
+        self.application = application
+        self.chunk_size = chunk_size
+
+    async def __call__(self, scope, receive, send):
+        match = EXPORT_PATH.fullmatch(scope['path']) if scope['type'] == 'http' else None
+        format = QueryDict(scope.get('query_string', b'')).get('format', 'csv')
+        if match is None or scope['method'] != 'GET' or format not in EXPORT_CONTENT_TYPES:
+            return await self.application(scope, receive, send)
+        restaurant_id = int(match['restaurant_id'])
+        if await run_query(restaurant_access, scope, restaurant_id) != 200:
+            return await self.application(scope, receive, send)
+        disposition = f'attachment; filename="menu-{restaurant_id}.{format}"'
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'Content-Type', EXPORT_CONTENT_TYPES[format].encode()), (b'Content-Disposition', disposition.encode())]})
+        writer = MenuWriter(format)
+        await self.send_body(send, writer.start())
+        rows = await run_query(menu_rows, restaurant_id, None, self.chunk_size)
+        while rows:
+            await self.send_body(send, writer.rows(rows))
+            rows = await run_query(menu_rows, restaurant_id, rows[-1], self.chunk_size) \
+                if len(rows) == self.chunk_size else []
+        await send({'type': 'http.response.body', 'body': writer.end().encode()})
+
+    @staticmethod
+    async def send_body(send, text):
+        await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
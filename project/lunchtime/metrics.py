@@ -0,0 +1,232 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('lunchtime.metrics')
+
+DEFAULT_SINKS = ['lunchtime.metrics.log_sink', 'lunchtime.metrics.prometheus']
+
+_current = contextvars.ContextVar('lunchtime_metrics', default=None)
+
+
+class BudgetExceeded(Exception):
+    """Raised when view exceeds its budget and LUNCHTIME_BUDGETS_RAISE setting is enabled."""
+
+
+class Budget:
+    """Limits of query count and of database, template and wall time (in seconds) of one request to view."""
+    def __init__(self, queries=None, db_time=None, template_time=None, wall_time=None):
+        self.limits = {'queries': queries, 'db_time': db_time, 'template_time': template_time,
+                       'wall_time': wall_time}
+
+    def violations(self, metrics):
+        """Return list of descriptions of limits exceeded by request."""
+        return [f'{name} {getattr(metrics, name):.4g} > {limit:.4g}' for name, limit in self.limits.items()
+                if limit is not None and getattr(metrics, name) > limit]
+
+
+class RequestMetrics:
+    """Cost of one request: number and time of SQL queries, time of rendering templates and wall time."""
+    def __init__(self, method):
+        self.view = None
+        self.method = method
+        self.status = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.wall_time = 0.0
+        self.started = 0.0
+        self.violations = []
+        self.template_depth = 0
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f'{self.view} {self.method} {self.status} queries={self.queries} db={self.db_time * 1000:.1f}ms ' \
+               f'template={self.template_time * 1000:.1f}ms wall={self.wall_time * 1000:.1f}ms'
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count and time query. Queries run concurrently in several threads add up their times."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.db_time += time.perf_counter() - start
+                self.queries += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper of every database connection which counts query into metrics of current request.
+
+    Metrics are found in context variable, so queries run by sync_to_async in other threads are counted too.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """Add record_query to execute wrappers of database connection unless it is there already."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class LogSink:
+    """Write metrics of every request to log."""
+    def record(self, metrics):
+        logger.info('%s', metrics)
+
+
+class RingBufferSink:
+    """Keep metrics of the most recent requests in memory."""
+    def __init__(self, maxsize=1000):
+        self.buffer = deque(maxlen=maxsize)
+
+    def record(self, metrics):
+        self.buffer.append(metrics)
+
+    def records(self, view=None):
+        """Return list of stored metrics, optionally only of requests to view with given URL name."""
+        return [metrics for metrics in list(self.buffer) if view is None or metrics.view == view]
+
+    def clear(self):
+        self.buffer.clear()
+
+
+class PrometheusSink:
+    """Sum metrics per view and render them in Prometheus text format. Counters are kept per process."""
+    COUNTERS = (
+        ('requests', 'Number of handled requests.'),
+        ('queries', 'Number of executed SQL queries.'),
+        ('db_seconds', 'Time spent executing SQL queries.'),
+        ('template_seconds', 'Time spent rendering templates.'),
+        ('request_seconds', 'Wall time of handling requests.'),
+        ('budget_violations', 'Number of requests which exceeded budget of view.'),
+    )
+
+    def __init__(self):
+        self.counters = defaultdict(lambda: dict.fromkeys((name for name, help_text in self.COUNTERS), 0))
+        self.lock = threading.Lock()
+
+    def record(self, metrics):
+        with self.lock:
+            counters = self.counters[metrics.view]
+            counters['requests'] += 1
+            counters['queries'] += metrics.queries
+            counters['db_seconds'] += metrics.db_time
+            counters['template_seconds'] += metrics.template_time
+            counters['request_seconds'] += metrics.wall_time
+            counters['budget_violations'] += bool(metrics.violations)
+
+    def render(self):
+        """Return all counters in Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, help_text in self.COUNTERS:
+                lines += [f'# HELP lunchtime_{name}_total {help_text}', f'# TYPE lunchtime_{name}_total counter']
+                for view, counters in sorted(self.counters.items()):
+                    lines.append(f'lunchtime_{name}_total{{view="{view}"}} {counters[name]:g}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+
+
+log_sink = LogSink()
+ring_buffer = RingBufferSink()
+prometheus = PrometheusSink()
+
+
+class TimedTemplate(Template):
+    """Template which adds time of its rendering to metrics of current request."""
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        metrics.template_depth += 1
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend which measures time of rendering templates."""
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class MetricsRecorder:
+    """Record cost of every request per URL name and check it against budget declared by view class.
+
+    View declares its limits in `budget` attribute. Exceeded budget is logged as warning, or raised as
+    BudgetExceeded when LUNCHTIME_BUDGETS_RAISE setting is enabled, as it is in tests.
+    """
+    def __init__(self):
+        self.sinks = [import_string(path) for path in getattr(settings, 'LUNCHTIME_METRICS_SINKS', DEFAULT_SINKS)]
+
+    def start(self, request):
+        """Return new metrics of request made current and token which resets them."""
+        for connection in connections.all():
+            install_query_recorder(connection)
+        metrics = RequestMetrics(request.method)
+        metrics.started = time.perf_counter()
+        return metrics, _current.set(metrics)
+
+    def finish(self, request, response, metrics):
+        """Complete metrics of request, pass them to sinks and check budget of view."""
+        metrics.wall_time = time.perf_counter() - metrics.started
+        metrics.status = response.status_code
+        match = getattr(request, 'resolver_match', None)
+        metrics.view = match.view_name if match else 'unresolved'
+        budget = getattr(getattr(match.func, 'view_class', None), 'budget', None) if match else None
+        if budget is not None:
+            metrics.violations = budget.violations(metrics)
+        for sink in self.sinks:
+            sink.record(metrics)
+        if metrics.violations:
+            message = f'{metrics.view} exceeded budget: {", ".join(metrics.violations)}'
+            if getattr(settings, 'LUNCHTIME_BUDGETS_RAISE', False):
+                raise BudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Middleware which records metrics of requests by MetricsRecorder, both under WSGI and ASGI."""
+    recorder = MetricsRecorder()
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics, token = recorder.start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return recorder.finish(request, response, metrics)
+    else:
+        def middleware(request):
+            metrics, token = recorder.start(request)
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return recorder.finish(request, response, metrics)
+    return middleware
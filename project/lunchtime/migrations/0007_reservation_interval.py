@@ -0,0 +1,199 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:51
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_end_time(apps, schema_editor):
+    """Compute end of existing reservations."""
+    Reservation = apps.get_model('lunchtime', 'Reservation')
+    for reservation in Reservation.objects.all():
+        start = datetime.datetime.combine(datetime.date.min, reservation.time)
+        end = start + datetime.timedelta(minutes=reservation.duration)
+        reservation.end_time = end.time() if end.date() == datetime.date.min else datetime.time(23, 59, 59)
+        reservation.save(update_fields=['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lunchtime', '0006_auto_20201006_1936'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='user',
+        ),
+        migrations.AlterModelOptions(
+            name='restaurant',
+            options={'ordering': ['name']},
+        ),
+        migrations.RemoveField(
+            model_name='restaurant',
+            name='staff',
+        ),
+        migrations.RemoveField(
+            model_name='review',
+            name='reviewer',
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='duration',
+            field=models.PositiveSmallIntegerField(default=60, verbose_name='czas trwania (min)'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='end_time',
+            field=models.TimeField(default=datetime.time(0, 0), editable=False, verbose_name='koniec rezerwacji'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, upload_to='media/', verbose_name='logo'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='owner',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='auth.user', verbose_name='przedstawiciel restauracji'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='auth.user', verbose_name='użytkownik'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='reserved',
+            field=models.BooleanField(default=False, verbose_name='zarezerwowany'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='category',
+            field=models.IntegerField(choices=[(1, 'śniadanie'), (2, 'lunch'), (3, 'kolacja')], verbose_name='kategoria'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='description',
+            field=models.TextField(verbose_name='opis'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='name',
+            field=models.CharField(max_length=64, verbose_name='nazwa'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=5, verbose_name='cena'),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='date',
+            field=models.DateField(verbose_name='data rezerwacji'),
+        ),
+        migrations.RemoveField(
+            model_name='reservation',
+            name='meal',
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='meal',
+            field=models.ManyToManyField(to='lunchtime.Meal', verbose_name='posiłek'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='table',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.table', verbose_name='stolik'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='time',
+            field=models.TimeField(verbose_name='godzina rezerwacji'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='użytkownik'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='address',
+            field=models.CharField(max_length=256, verbose_name='adres'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='description',
+            field=models.TextField(verbose_name='opis'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='email',
+            field=models.EmailField(max_length=64, verbose_name='adres e-mail'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='name',
+            field=models.CharField(max_length=64, verbose_name='nazwa'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='phone',
+            field=models.CharField(max_length=20, verbose_name='telefon'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='date',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='data'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='rate',
+            field=models.IntegerField(choices=[(5, '*****'), (4, '****'), (3, '***'), (2, '**'), (1, '*')], verbose_name='ocena'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='review',
+            field=models.TextField(verbose_name='recenzja'),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='persons',
+            field=models.IntegerField(verbose_name='liczba osób'),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja'),
+        ),
+        migrations.RunPython(set_end_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['restaurant', 'date', 'time', 'end_time'], name='reservation_interval_idx'),
+        ),
+        migrations.DeleteModel(
+            name='UserProfile',
+        ),
+    ]
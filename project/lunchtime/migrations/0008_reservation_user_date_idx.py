@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0007_reservation_interval'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-date', '-time', 'id'], name='reservation_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:56
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def compute_ratings(apps, schema_editor):
+    """Compute rating of existing restaurants from their reviews."""
+    Restaurant = apps.get_model('lunchtime', 'Restaurant')
+    Review = apps.get_model('lunchtime', 'Review')
+    star_counts = {f'stars_{stars}': Count('id', filter=Q(rate=stars)) for stars in range(1, 6)}
+    for row in Review.objects.order_by().values('restaurant_id').annotate(review_count=Count('id'),
+                                                                           rating_sum=Sum('rate'), **star_counts):
+        restaurant_id = row.pop('restaurant_id')
+        row['rating'] = row['rating_sum'] / row['review_count']
+        Restaurant.objects.filter(pk=restaurant_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0008_reservation_user_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='średnia ocena'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='suma ocen'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='liczba recenzji'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['-rating', 'name'], name='restaurant_rating_idx'),
+        ),
+    ]
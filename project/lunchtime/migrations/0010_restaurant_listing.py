@@ -0,0 +1,44 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:57
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0009_restaurant_rating'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='restaurant',
+            name='restaurant_rating_idx',
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='closes_at',
+            field=models.TimeField(default=datetime.time(20, 0), verbose_name='otwarte do'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='opens_at',
+            field=models.TimeField(default=datetime.time(8, 0), verbose_name='otwarte od'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['restaurant', 'price'], name='meal_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['name', 'id'], name='restaurant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['-rating', 'name', 'id'], name='restaurant_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['opens_at', 'closes_at'], name='restaurant_hours_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.1.14 on 2026-10-18 10:59
+
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FOLDED_LETTERS = str.maketrans({'ł': 'l', 'Ł': 'L'})
+
+
+def fold(text):
+    """Return text in lowercase without diacritics, as lunchtime.text.fold did when migration was written."""
+    text = unicodedata.normalize('NFKD', text.translate(FOLDED_LETTERS))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def create_index(apps, schema_editor):
+    """Create GIN index over tsvector of text on PostgreSQL, FTS5 table kept in sync by triggers on SQLite."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX searchdocument_text_gin ON lunchtime_searchdocument "
+                              "USING GIN (to_tsvector('simple', text))")
+    elif vendor == 'sqlite':
+        schema_editor.execute("CREATE VIRTUAL TABLE lunchtime_searchdocument_fts USING fts5("
+                              "text, content='lunchtime_searchdocument', content_rowid='id')")
+        schema_editor.execute("CREATE TRIGGER lunchtime_searchdocument_ai AFTER INSERT ON lunchtime_searchdocument "
+                              "BEGIN INSERT INTO lunchtime_searchdocument_fts(rowid, text) VALUES (new.id, new.text); "
+                              "END")
+        schema_editor.execute("CREATE TRIGGER lunchtime_searchdocument_ad AFTER DELETE ON lunchtime_searchdocument "
+                              "BEGIN INSERT INTO lunchtime_searchdocument_fts(lunchtime_searchdocument_fts, rowid, "
+                              "text) VALUES ('delete', old.id, old.text); END")
+        schema_editor.execute("CREATE TRIGGER lunchtime_searchdocument_au AFTER UPDATE ON lunchtime_searchdocument "
+                              "BEGIN INSERT INTO lunchtime_searchdocument_fts(lunchtime_searchdocument_fts, rowid, "
+                              "text) VALUES ('delete', old.id, old.text); "
+                              "INSERT INTO lunchtime_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END")
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS searchdocument_text_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS lunchtime_searchdocument_fts')
+
+
+def index_documents(apps, schema_editor):
+    """Store search documents of existing restaurants and meals."""
+    Restaurant = apps.get_model('lunchtime', 'Restaurant')
+    Meal = apps.get_model('lunchtime', 'Meal')
+    SearchDocument = apps.get_model('lunchtime', 'SearchDocument')
+    for restaurant in Restaurant.objects.iterator():
+        SearchDocument.objects.create(restaurant=restaurant, text=fold(
+            ' '.join([restaurant.name, restaurant.address, restaurant.description])))
+    for meal in Meal.objects.iterator():
+        SearchDocument.objects.create(restaurant_id=meal.restaurant_id, meal=meal,
+                                      text=fold(' '.join([meal.name, meal.description])))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0010_restaurant_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='tekst')),
+                ('meal', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, to='lunchtime.meal', verbose_name='posiłek')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja')),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(index_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:00
+
+import unicodedata
+
+from django.db import migrations, models
+
+FOLDED_LETTERS = str.maketrans({'ł': 'l', 'Ł': 'L'})
+
+
+def fold(text):
+    """Return text in lowercase without diacritics, as lunchtime.text.fold did when migration was written."""
+    text = unicodedata.normalize('NFKD', text.translate(FOLDED_LETTERS))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def fold_names(apps, schema_editor):
+    """Store folded names of existing restaurants."""
+    Restaurant = apps.get_model('lunchtime', 'Restaurant')
+    for restaurant in Restaurant.objects.iterator():
+        Restaurant.objects.filter(pk=restaurant.pk).update(name_folded=fold(restaurant.name)[:64])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0011_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='name_folded',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fold_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['name_folded'], name='restaurant_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
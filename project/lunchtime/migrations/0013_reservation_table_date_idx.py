@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0012_restaurant_name_folded'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'date', 'time'], name='reservation_table_date_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:03
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SLOT_MINUTES = 15
+SLOTS_BYTES = 24 * 60 // SLOT_MINUTES // 8
+
+
+def slot_mask(start, end):
+    """Return bitmap of 15-minute slots which interval from start to end touches, partially used ones too."""
+    first = (start.hour * 60 + start.minute) // SLOT_MINUTES
+    end_minutes = end.hour * 60 + end.minute + (1 if end.second or end.microsecond else 0)
+    last = min(-(-end_minutes // SLOT_MINUTES), SLOTS_BYTES * 8)
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def to_bytes(bitmap):
+    return bitmap.to_bytes(SLOTS_BYTES, 'big')
+
+
+def compute_bitmaps(apps, schema_editor):
+    """Store bitmaps of occupied slots for existing reservations."""
+    Reservation = apps.get_model('lunchtime', 'Reservation')
+    TableSlots = apps.get_model('lunchtime', 'TableSlots')
+    bitmaps = defaultdict(int)
+    restaurants = {}
+    for reservation in Reservation.objects.iterator():
+        bitmaps[(reservation.table_id, reservation.date)] |= slot_mask(reservation.time, reservation.end_time)
+        restaurants[reservation.table_id] = reservation.restaurant_id
+    TableSlots.objects.bulk_create([TableSlots(table_id=table_id, restaurant_id=restaurants[table_id], date=date,
+                                               slots=to_bytes(bitmap))
+                                    for (table_id, date), bitmap in bitmaps.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0013_reservation_table_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableSlots',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='data')),
+                ('slots', models.BinaryField(verbose_name='zajęte sloty')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.restaurant', verbose_name='restauracja')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.table', verbose_name='stolik')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tableslots',
+            index=models.Index(fields=['restaurant', 'date'], name='tableslots_restaurant_date_idx'),
+        ),
+        migrations.RunPython(compute_bitmaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tableslots',
+            constraint=models.UniqueConstraint(fields=('table', 'date'), name='tableslots_table_date_unique'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunchtime', '0015_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meal',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='zmieniono'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='zmieniono'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='zmieniono'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='zmieniono'),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='zmieniono'),
+        ),
+    ]
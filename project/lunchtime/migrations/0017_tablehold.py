@@ -0,0 +1,35 @@
+# Generated by Django 3.1.14 on 2026-10-18 11:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lunchtime', '0016_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableHold',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='data')),
+                ('slot', models.SmallIntegerField(verbose_name='slot')),
+                ('expires_at', models.DateTimeField(verbose_name='wygasa')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lunchtime.table', verbose_name='stolik')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='użytkownik')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tablehold',
+            index=models.Index(fields=['expires_at'], name='tablehold_expires_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tablehold',
+            constraint=models.UniqueConstraint(fields=('table', 'date', 'slot'), name='tablehold_slot_unique'),
+        ),
+    ]
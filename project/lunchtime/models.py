@@ -1,6 +1,11 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils.dateparse import parse_time
+
+from .text import fold
 
 # Create your models here.
 
@@ -19,16 +24,42 @@ CATEGORIES = (
     (3, "kolacja"),
 )
 
+DEFAULT_DURATION = 60
+OPENS_AT = datetime.time(8, 0)
+CLOSES_AT = datetime.time(20, 0)
+MAX_PERSONS = 100
+
+
+def end_of_interval(start, duration):
+    """Return end time of interval which begins at start and lasts duration minutes. Interval ends on the same day."""
+    start_datetime = datetime.datetime.combine(datetime.date.min, start)
+    end_datetime = start_datetime + datetime.timedelta(minutes=duration)
+    if end_datetime.date() != datetime.date.min:
+        return datetime.time(23, 59, 59)
+    return end_datetime.time()
+
 
 class Restaurant(models.Model):
     """Stores restaurant."""
     name = models.CharField(verbose_name='nazwa', max_length=64)
+    name_folded = models.CharField(max_length=64, editable=False, default='')
     address = models.CharField(verbose_name='adres', max_length=256)
     phone = models.CharField(verbose_name='telefon', max_length=20)
     email = models.EmailField(verbose_name='adres e-mail', max_length=64)
     description = models.TextField(verbose_name='opis')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='przedstawiciel restauracji')
     logo = models.ImageField(verbose_name='logo', upload_to='media/', null=True, blank=True)
+    opens_at = models.TimeField(verbose_name='otwarte od', default=OPENS_AT)
+    closes_at = models.TimeField(verbose_name='otwarte do', default=CLOSES_AT)
+    review_count = models.PositiveIntegerField(verbose_name='liczba recenzji', default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(verbose_name='suma ocen', default=0, editable=False)
+    rating = models.FloatField(verbose_name='średnia ocena', default=0, editable=False)
+    stars_1 = models.PositiveIntegerField(default=0, editable=False)
+    stars_2 = models.PositiveIntegerField(default=0, editable=False)
+    stars_3 = models.PositiveIntegerField(default=0, editable=False)
+    stars_4 = models.PositiveIntegerField(default=0, editable=False)
+    stars_5 = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='zmieniono')
 
     def __str__(self):
         """Return name of restaurant."""
@@ -38,9 +69,30 @@ class Restaurant(models.Model):
         """Return url for restaurant object."""
         return reverse('restaurant-details', kwargs={'restaurant_id': self.id})
 
+    def save(self, *args, **kwargs):
+        """Store name in lowercase without diacritics for prefix search and save restaurant."""
+        self.name_folded = fold(self.name)[:64]
+        super().save(*args, **kwargs)
+
+    def stars_histogram(self):
+        """Return list of pairs: number of stars and number of reviews with such rate."""
+        return [(stars, getattr(self, f'stars_{stars}')) for stars, name in STARS]
+
+    def is_open(self, at):
+        """Return True if restaurant is open at given time. Restaurant may close after midnight."""
+        if self.opens_at <= self.closes_at:
+            return self.opens_at <= at < self.closes_at
+        return at >= self.opens_at or at < self.closes_at
+
     class Meta:
-        """Display restaurants ordered by name."""
+        """Display restaurants ordered by name. Index restaurants by name, rating and opening hours."""
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='restaurant_name_idx'),
+            models.Index(fields=['-rating', 'name', 'id'], name='restaurant_rating_idx'),
+            models.Index(fields=['opens_at', 'closes_at'], name='restaurant_hours_idx'),
+            models.Index(fields=['name_folded'], name='restaurant_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
 
 class Table(models.Model):
@@ -48,6 +100,13 @@ class Table(models.Model):
     persons = models.IntegerField(verbose_name='liczba osób')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='restauracja')
     reserved = models.BooleanField(verbose_name='zarezerwowany', default=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='zmieniono')
+
+    class Meta:
+        """Index tables of restaurant by number of seats."""
+        indexes = [
+            models.Index(fields=['restaurant', 'persons'], name='table_persons_idx'),
+        ]
 
     def __str__(self):
         """Return number of persons."""
@@ -64,10 +123,15 @@ class Meal(models.Model):
     description = models.TextField(verbose_name='opis')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='restauracja')
     price = models.DecimalField(max_digits=5, decimal_places=2, verbose_name='cena')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='zmieniono')
 
     class Meta:
-        """Display meals ordered by category."""
+        """Display meals ordered by category. Index meals of restaurant by category and price."""
         ordering = ['category']
+        indexes = [
+            models.Index(fields=['restaurant', 'category'], name='meal_category_idx'),
+            models.Index(fields=['restaurant', 'price'], name='meal_price_idx'),
+        ]
 
     def __str__(self):
         """Return name of meal."""
@@ -83,12 +147,27 @@ class Reservation(models.Model):
     table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='stolik')
     date = models.DateField(verbose_name='data rezerwacji')
     time = models.TimeField(verbose_name='godzina rezerwacji')
+    duration = models.PositiveSmallIntegerField(verbose_name='czas trwania (min)', default=DEFAULT_DURATION)
+    end_time = models.TimeField(verbose_name='koniec rezerwacji', editable=False)
     meal = models.ManyToManyField(Meal, verbose_name='posiłek')
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='użytkownik')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='zmieniono')
 
     class Meta:
-        """Display reservations ordered by date."""
+        """Display reservations ordered by date. Index reservations of restaurant by day and time interval."""
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['restaurant', 'date', 'time', 'end_time'], name='reservation_interval_idx'),
+            models.Index(fields=['user', '-date', '-time', 'id'], name='reservation_user_date_idx'),
+            models.Index(fields=['table', 'date', 'time'], name='reservation_table_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Compute end of reservation and save it."""
+        if isinstance(self.time, str):
+            self.time = parse_time(self.time)
+        self.end_time = end_of_interval(self.time, self.duration)
+        super().save(*args, **kwargs)
 
 
 class Review(models.Model):
@@ -98,8 +177,54 @@ class Review(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='restauracja')
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='użytkownik')
     date = models.DateTimeField(auto_now_add=True, verbose_name='data')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='zmieniono')
 
     class Meta:
-        """Display reviews ordered by date."""
+        """Display reviews ordered by date. Index reviews of restaurant and of user by date."""
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['restaurant', '-date'], name='review_restaurant_date_idx'),
+            models.Index(fields=['user', '-date'], name='review_user_date_idx'),
+        ]
+
 
+class SearchDocument(models.Model):
+    """Stores searchable text of restaurant or of its meal, folded to lowercase letters without diacritics."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='restauracja')
+    meal = models.OneToOneField(Meal, on_delete=models.CASCADE, verbose_name='posiłek', null=True)
+    text = models.TextField(verbose_name='tekst')
+
+
+class TableSlots(models.Model):
+    """Stores occupied 15-minute slots of table on given day as bitmap. Related to models Table, Restaurant."""
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='stolik')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, verbose_name='restauracja')
+    date = models.DateField(verbose_name='data')
+    slots = models.BinaryField(verbose_name='zajęte sloty')
+
+    class Meta:
+        """Store one bitmap per table and day. Index bitmaps of restaurant by day."""
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'date'], name='tableslots_table_date_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurant', 'date'], name='tableslots_restaurant_date_idx'),
+        ]
+
+
+class TableHold(models.Model):
+    """Stores 15-minute slot of table held for user in booking wizard until expiry. Related to models Table, User."""
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, verbose_name='stolik')
+    date = models.DateField(verbose_name='data')
+    slot = models.SmallIntegerField(verbose_name='slot')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='użytkownik')
+    expires_at = models.DateTimeField(verbose_name='wygasa')
+
+    class Meta:
+        """Let only one user hold slot of table. Index holds by expiry for sweeping."""
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'date', 'slot'], name='tablehold_slot_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='tablehold_expires_idx'),
+        ]
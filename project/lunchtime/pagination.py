@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    """Return cursor which points at row with given values of ordering fields."""
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, length):
+    """Return values of ordering fields stored in cursor. Raise ValueError for malformed cursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError):
+        raise ValueError('Niepoprawny kursor.')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Niepoprawny kursor.')
+    return values
+
+
+def after(ordering, values):
+    """Return condition which selects rows placed after row with given values in ordering.
+
+    For ordering ['-date', 'id'] it is: date <= value_1 AND (date < value_1 OR (date = value_1 AND id > value_2)).
+    The redundant bound on the first field lets the database start index scan at the cursor.
+    """
+    first = ordering[0]
+    bound = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': values[0]})
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[position]})
+        for previous_field, previous_value in zip(ordering[:position], values[:position]):
+            step &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= step
+    return bound & condition
+
+
+class KeysetPage:
+    """Page of objects with cursor pointing at the last of them."""
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        """Return True when there are more objects after this page."""
+        return self.next_cursor is not None
+
+
+def keyset_page(queryset, ordering, page_size, cursor=None):
+    """Return page of queryset, of objects or of dictionaries from values(), which starts after cursor.
+
+    Unlike offset pagination, the database seeks directly to the first row of the page through index on
+    ordering fields, so every page costs the same. Raise ValueError for malformed cursor, also for cursor
+    with values which don't fit ordering fields.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        try:
+            queryset = queryset.filter(after(ordering, decode_cursor(cursor, len(ordering))))
+        except (ValidationError, TypeError):
+            raise ValueError('Niepoprawny kursor.')
+    object_list = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(object_list) > page_size:
+        object_list = object_list[:page_size]
+        last = object_list[-1]
+        names = [field.lstrip('-') for field in ordering]
+        next_cursor = encode_cursor([last[name] if isinstance(last, dict) else getattr(last, name) for name in names])
+    return KeysetPage(object_list, next_cursor)
+
+
+class KeysetPaginationMixin:
+    """Paginate ListView by cursor passed in GET parameter instead of page number."""
+    keyset_ordering = ('id',)
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        """Return fields which order pages. The last of them has to be unique."""
+        return self.keyset_ordering
+
+    def get_cursor_query(self):
+        """Return query string of request without cursor, to be used in links to next pages."""
+        query = self.request.GET.copy()
+        query.pop(self.cursor_kwarg, None)
+        return query.urlencode()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_query'] = self.get_cursor_query()
+        return context
+
+    def paginate_queryset(self, queryset, page_size):
+        """Return page of queryset selected by cursor. Malformed cursor starts again at the first page."""
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            page = keyset_page(queryset, self.get_keyset_ordering(), page_size, cursor)
+        except ValueError:
+            cursor = None
+            page = keyset_page(queryset, self.get_keyset_ordering(), page_size)
+        return None, page, page.object_list, page.has_next() or bool(cursor)
@@ -0,0 +1,56 @@
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, Now, NullIf
+
+from .models import Restaurant, Review, STARS
+
+RATING_FIELDS = ['review_count', 'rating_sum', 'rating'] + [f'stars_{stars}' for stars, name in STARS]
+
+
+def change_rating(restaurant_id, rate, sign):
+    """Add (sign=1) or remove (sign=-1) review's rate from restaurant's rating in one update.
+
+    Right side of update refers to values from before the update, so average is computed from new sum and
+    count in the same statement.
+    """
+    Restaurant.objects.filter(pk=restaurant_id).update(
+        review_count=F('review_count') + sign,
+        rating_sum=F('rating_sum') + sign * rate,
+        rating=Coalesce(Cast(F('rating_sum') + sign * rate, FloatField()) / NullIf(F('review_count') + sign, 0),
+                        0.0),
+        **{f'stars_{rate}': F(f'stars_{rate}') + sign},
+        updated_at=Now(),
+    )
+
+
+def add_rating(review):
+    """Add rate of new review to restaurant's rating."""
+    change_rating(review.restaurant_id, review.rate, 1)
+
+
+def remove_rating(review):
+    """Remove rate of deleted review from restaurant's rating."""
+    change_rating(review.restaurant_id, review.rate, -1)
+
+
+def computed_ratings():
+    """Return dictionary of restaurant's id and its rating fields computed from reviews in one grouped query."""
+    star_counts = {f'stars_{stars}': Count('id', filter=Q(rate=stars)) for stars, name in STARS}
+    ratings = {}
+    for row in Review.objects.order_by().values('restaurant_id').annotate(review_count=Count('id'),
+                                                                           rating_sum=Sum('rate'), **star_counts):
+        restaurant_id = row.pop('restaurant_id')
+        row['rating'] = row['rating_sum'] / row['review_count']
+        ratings[restaurant_id] = row
+    return ratings
+
+
+def rating_drift():
+    """Return list of restaurants whose stored rating differs from their reviews with correct rating fields."""
+    ratings = computed_ratings()
+    empty = {field: 0 for field in RATING_FIELDS}
+    drift = []
+    for restaurant in Restaurant.objects.only('id', 'name', *RATING_FIELDS).iterator():
+        expected = ratings.get(restaurant.id, empty)
+        if any(abs(getattr(restaurant, field) - expected[field]) > 1e-9 for field in RATING_FIELDS):
+            drift.append((restaurant, expected))
+    return drift
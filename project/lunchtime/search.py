@@ -0,0 +1,92 @@
+import itertools
+import re
+
+from django.db import connection
+
+from .models import Meal, Restaurant, SearchDocument
+from .text import fold
+
+
+def terms(query):
+    """Return list of folded words of query."""
+    return re.findall(r'\w+', fold(query))
+
+
+def restaurant_text(restaurant):
+    """Return folded searchable text of restaurant."""
+    return fold(' '.join([restaurant.name, restaurant.address, restaurant.description]))
+
+
+def meal_text(meal):
+    """Return folded searchable text of meal."""
+    return fold(' '.join([meal.name, meal.description]))
+
+
+def index_restaurant(restaurant):
+    """Store search document of restaurant."""
+    SearchDocument.objects.update_or_create(restaurant=restaurant, meal=None,
+                                            defaults={'text': restaurant_text(restaurant)})
+
+
+def index_meal(meal):
+    """Store search document of meal."""
+    SearchDocument.objects.update_or_create(meal=meal, defaults={'restaurant_id': meal.restaurant_id,
+                                                                 'text': meal_text(meal)})
+
+
+def index_meals(meals):
+    """Store search documents of many meals by two queries, e.g. after they were saved in bulk."""
+    SearchDocument.objects.filter(meal__in=[meal.id for meal in meals]).delete()
+    SearchDocument.objects.bulk_create([SearchDocument(restaurant_id=meal.restaurant_id, meal_id=meal.id,
+                                                       text=meal_text(meal)) for meal in meals])
+
+
+def matching_ids(words, limit):
+    """Return ids of documents containing words or words beginning with them, best matches first."""
+    if connection.vendor == 'postgresql':
+        sql = ("SELECT id FROM lunchtime_searchdocument WHERE to_tsvector('simple', text) @@ to_tsquery('simple', %s) "
+               "ORDER BY ts_rank(to_tsvector('simple', text), to_tsquery('simple', %s)) DESC LIMIT %s")
+        query = ' & '.join(f'{word}:*' for word in words)
+        params = [query, query, limit]
+    elif connection.vendor == 'sqlite':
+        sql = ('SELECT rowid FROM lunchtime_searchdocument_fts WHERE lunchtime_searchdocument_fts MATCH %s '
+               'ORDER BY rank LIMIT %s')
+        params = [' '.join(f'"{word}"*' for word in words), limit]
+    else:
+        documents = SearchDocument.objects.all()
+        for word in words:
+            documents = documents.filter(text__contains=word)
+        return list(documents.values_list('id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(query, limit=50):
+    """Return list of search documents of restaurants and meals matching query, best matches first."""
+    words = terms(query)
+    if not words:
+        return []
+    ids = matching_ids(words, limit)
+    documents = SearchDocument.objects.select_related('restaurant', 'meal').in_bulk(ids)
+    return [documents[pk] for pk in ids if pk in documents]
+
+
+def rebuild_index(batch_size=1000):
+    """Store search documents of all restaurants and meals again in batches. Return number of documents."""
+    SearchDocument.objects.all().delete()
+    count = 0
+    batch = []
+    documents = itertools.chain(
+        (SearchDocument(restaurant_id=restaurant.id, text=restaurant_text(restaurant))
+         for restaurant in Restaurant.objects.only('name', 'address', 'description').iterator()),
+        (SearchDocument(restaurant_id=meal.restaurant_id, meal_id=meal.id, text=meal_text(meal))
+         for meal in Meal.objects.only('restaurant_id', 'name', 'description').iterator()))
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            SearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+    return count + len(batch)
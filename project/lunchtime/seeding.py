@@ -0,0 +1,170 @@
+import datetime
+import random
+import time as timer
+from collections import defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from . import bitmaps
+from .models import Restaurant, Table, Meal, Reservation, Review, TableSlots, DEFAULT_DURATION, end_of_interval
+from .ratings import computed_ratings
+from .search import rebuild_index
+from .text import fold
+
+USERNAME_PREFIX = 'bench_'
+
+DISHES = ['pieczeń', 'żurek', 'pierogi', 'bigos', 'schabowy', 'gołąbki', 'barszcz', 'naleśniki', 'śniadanie',
+          'sałatka', 'pizza', 'makaron', 'zupa', 'placki', 'kotlet', 'łosoś', 'pstrąg', 'kaczka']
+ADDITIONS = ['z jagnięciny', 'ze śmietaną', 'z grzybami', 'z kapustą', 'po góralsku', 'z ziemniakami',
+             'w sosie własnym', 'z serem', 'z owocami', 'domowe', 'z rusztu', 'wegetariańskie']
+KINDS = ['Bistro', 'Karczma', 'Gospoda', 'Restauracja', 'Trattoria', 'Pierogarnia', 'Jadłodajnia', 'Kuchnia']
+NAMES = ['Pod Wawelem', 'Smakosz', 'Pod Złotym Kurkiem', 'Babcia Zosia', 'Stary Młyn', 'Zielony Ogród',
+         'Pod Aniołami', 'Wierzbowa', 'Rybka', 'Kogucik', 'Na Zdrowie', 'Gęsi Puch']
+STREETS = ['Floriańska', 'Grodzka', 'Dietla', 'Starowiślna', 'Karmelicka', 'Długa', 'Szewska', 'Józefa',
+           'Lwowska', 'Dąbrowskiego', 'Rynek Główny', 'Kalwaryjska']
+OPINIONS = ['Pysznie!', 'Świetne dania', 'Miła obsługa', 'Długo czekaliśmy na zamówienie', 'Porcje mogłyby być '
+            'większe', 'Wrócimy na pewno', 'Najlepsze pierogi w mieście', 'Za głośno', 'Polecam zupę dnia']
+FIRST_NAMES = ['Anna', 'Piotr', 'Katarzyna', 'Tomasz', 'Magdalena', 'Paweł', 'Agnieszka', 'Michał', 'Zofia']
+LAST_NAMES = ['Nowak', 'Kowalski', 'Wiśniewska', 'Wójcik', 'Kamińska', 'Lewandowski', 'Zielińska', 'Szymański']
+
+SCALES = {
+    'tiny': {'restaurants': 3, 'tables': 2, 'meals': 4, 'users': 2, 'days': 3, 'reviews': 2},
+    'small': {'restaurants': 20, 'tables': 8, 'meals': 30, 'users': 50, 'days': 365, 'reviews': 20},
+    'medium': {'restaurants': 200, 'tables': 10, 'meals': 40, 'users': 1000, 'days': 365, 'reviews': 50},
+    'large': {'restaurants': 1000, 'tables': 12, 'meals': 50, 'users': 10000, 'days': 730, 'reviews': 100},
+}
+
+
+class SeedResult:
+    """Numbers of inserted rows and time spent inserting them, per kind of rows."""
+    def __init__(self):
+        self.rows = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, name, rows, seconds):
+        self.rows[name] += rows
+        self.seconds[name] += seconds
+
+    def rows_per_second(self, name=None):
+        """Return throughput of inserting rows of given kind or of all rows."""
+        rows = self.rows[name] if name else sum(self.rows.values())
+        seconds = self.seconds[name] if name else sum(self.seconds.values())
+        return rows / seconds if seconds else 0.0
+
+
+def insert(model, objects, batch_size):
+    """Insert objects by batched bulk_create. Return their ids in order of objects.
+
+    Databases which don't return ids from bulk insert get them back by one query for ids greater than
+    the largest id before insert, so nothing else may insert into the table at the same time.
+    """
+    if not objects:
+        return []
+    last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    if objects[0].pk is not None:
+        return [obj.pk for obj in objects]
+    return list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+
+
+def seed_database(restaurants=20, tables=8, meals=30, users=50, days=365, reviews=20, reservations_per_table=3,
+                  meals_per_reservation=2, seed=0, batch_size=5000):
+    """Create synthetic restaurants, tables, meals, users, reviews and days of past reservations with meals.
+
+    The same seed always produces the same data. Rows are inserted by bulk_create, together with rows
+    of reservation's meals in through table, and skip signals, so bitmaps of occupied slots are computed
+    while generating reservations, and ratings and the search index are computed at the end.
+    Return SeedResult.
+    """
+    rng = random.Random(seed)
+    result = SeedResult()
+
+    def timed(name, model, objects, ids=True):
+        start = timer.perf_counter()
+        if ids:
+            ids = insert(model, objects, batch_size)
+        else:
+            model.objects.bulk_create(objects, batch_size=batch_size)
+        result.add(name, len(objects), timer.perf_counter() - start)
+        return ids
+
+    with transaction.atomic():
+        user_ids = timed('users', User, [
+            User(username=f'{USERNAME_PREFIX}{number}', password=make_password(None),
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                 email=f'{USERNAME_PREFIX}{number}@example.com') for number in range(users)])
+        owner_id = user_ids[0]
+        restaurant_objects = []
+        for number in range(restaurants):
+            name = f'{rng.choice(KINDS)} {rng.choice(NAMES)} {number}'
+            restaurant_objects.append(Restaurant(
+                name=name, name_folded=fold(name), address=f'{rng.choice(STREETS)} {rng.randint(1, 80)}, Kraków',
+                phone=f'12{rng.randint(1000000, 9999999)}', email=f'restauracja{number}@example.com',
+                description=f'{rng.choice(DISHES).capitalize()} {rng.choice(ADDITIONS)} i nie tylko.',
+                owner_id=owner_id, opens_at=datetime.time(rng.choice((8, 10, 12))),
+                closes_at=datetime.time(rng.choice((20, 22, 23)))))
+        restaurant_ids = timed('restaurants', Restaurant, restaurant_objects)
+        table_restaurants = [restaurant_id for restaurant_id in restaurant_ids for _ in range(tables)]
+        table_ids = timed('tables', Table, [Table(restaurant_id=restaurant_id, persons=rng.choice((2, 2, 4, 4, 6, 8)))
+                                            for restaurant_id in table_restaurants])
+        meal_restaurants = [restaurant_id for restaurant_id in restaurant_ids for _ in range(meals)]
+        meal_ids = timed('meals', Meal, [
+            Meal(restaurant_id=restaurant_id, category=rng.randint(1, 3), price=rng.randint(12, 90),
+                 name=f'{rng.choice(DISHES)} {rng.choice(ADDITIONS)}',
+                 description=f'{rng.choice(DISHES)} {rng.choice(ADDITIONS)}') for restaurant_id in meal_restaurants])
+        menus = defaultdict(list)
+        for meal_id, restaurant_id in zip(meal_ids, meal_restaurants):
+            menus[restaurant_id].append(meal_id)
+        per_batch = max(batch_size // max(reviews, 1), 1)
+        for first in range(0, len(restaurant_ids), per_batch):
+            timed('reviews', Review, [Review(restaurant_id=restaurant_id, user_id=rng.choice(user_ids),
+                                             rate=rng.choice((1, 2, 3, 4, 4, 5, 5)), review=rng.choice(OPINIONS))
+                                      for restaurant_id in restaurant_ids[first:first + per_batch]
+                                      for _ in range(reviews)], ids=False)
+        reservations, reservation_meals, slots = [], [], []
+        through = Reservation.meal.through
+
+        def flush():
+            reservation_ids = timed('reservations', Reservation, reservations)
+            timed('reservation meals', through, [through(reservation_id=reservation_id, meal_id=meal_id)
+                                                 for reservation_id, chosen in zip(reservation_ids, reservation_meals)
+                                                 for meal_id in chosen], ids=False)
+            timed('table slots', TableSlots, slots, ids=False)
+            reservations.clear()
+            reservation_meals.clear()
+            slots.clear()
+
+        today = datetime.date.today()
+        for offset in range(-days, 1):
+            date = today + datetime.timedelta(days=offset)
+            for table_id, restaurant_id in zip(table_ids, table_restaurants):
+                bitmap = 0
+                minute = rng.choice((0, 15))
+                # Reservations of table start on grid of DEFAULT_DURATION from 8:00 or 8:15, so they never overlap.
+                for number in rng.sample(range(12 * 60 // DEFAULT_DURATION), reservations_per_table):
+                    start = datetime.time(*divmod(8 * 60 + minute + number * DEFAULT_DURATION, 60))
+                    end = end_of_interval(start, DEFAULT_DURATION)
+                    reservations.append(Reservation(restaurant_id=restaurant_id, table_id=table_id, date=date,
+                                                    time=start, duration=DEFAULT_DURATION, end_time=end,
+                                                    user_id=rng.choice(user_ids)))
+                    menu = menus[restaurant_id]
+                    reservation_meals.append(rng.sample(menu, min(rng.randint(0, meals_per_reservation), len(menu))))
+                    bitmap |= bitmaps.slot_mask(start, end)
+                if bitmap:
+                    slots.append(TableSlots(table_id=table_id, restaurant_id=restaurant_id, date=date,
+                                            slots=bitmaps.to_bytes(bitmap)))
+            if len(reservations) >= batch_size:
+                flush()
+        flush()
+        start = timer.perf_counter()
+        ratings = computed_ratings()
+        for restaurant_id, fields in ratings.items():
+            Restaurant.objects.filter(pk=restaurant_id).update(**fields)
+        result.add('ratings', len(ratings), timer.perf_counter() - start)
+        start = timer.perf_counter()
+        documents = rebuild_index(batch_size)
+        result.add('search documents', documents, timer.perf_counter() - start)
+    return result
@@ -0,0 +1,123 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.|^[0-9a-f]{16}\.')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def accepted_encodings(request):
+    """Return set of content codings listed in Accept-Encoding header, without those with zero quality."""
+    encodings = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(coding.lower())
+    return encodings
+
+
+def byte_range(header, size):
+    """Return (first, last) byte of single range from Range header, None when header is missing or not
+    supported and False when range can't be satisfied."""
+    match = RANGE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        return False
+    return first, last
+
+
+def read_range(path, first, last):
+    """Yield chunks of file from first to last byte."""
+    with open(path, 'rb') as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def variant(request, full_path, encoding):
+    """Return content coding and path of precompressed copy of file which client accepts, or of the file.
+    Return also True when file has precompressed copies, so response varies by Accept-Encoding."""
+    variants = [(coding, full_path + extension) for coding, extension in ENCODINGS
+                if os.path.isfile(full_path + extension)]
+    if encoding is None and 'HTTP_RANGE' not in request.META:
+        accepted = accepted_encodings(request)
+        for coding, path in variants:
+            if coding in accepted:
+                return coding, path, True
+    return encoding, full_path, bool(variants)
+
+
+@require_safe
+def serve(request, path, document_root):
+    """Serve file from document_root, e.g. collected static files or uploaded media.
+
+    Files whose names contain hash of their content are cached by clients forever, the others are
+    revalidated by ETag. Precompressed copy stored next to file is sent when client accepts its coding,
+    and a single byte range of file is sent when it is requested.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('Nie znaleziono pliku.')
+    if not os.path.isfile(full_path):
+        raise Http404('Nie znaleziono pliku.')
+    content_type, encoding = mimetypes.guess_type(full_path)
+    coding, served_path, varies = variant(request, full_path, encoding)
+    stat = os.stat(served_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + coding if coding else ""}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = file_response(request, served_path, stat.st_size, content_type or 'application/octet-stream',
+                                 etag)
+        if coding:
+            response['Content-Encoding'] = coding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = IMMUTABLE if HASHED_NAME.search(posixpath.basename(path)) else REVALIDATE
+    if varies:
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def file_response(request, path, size, content_type, etag):
+    """Return response with whole file or with requested range of it."""
+    header = request.META.get('HTTP_RANGE')
+    if header and request.META.get('HTTP_IF_RANGE', etag) != etag:
+        header = None
+    requested = byte_range(header, size)
+    if requested is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if requested is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+    first, last = requested
+    response = StreamingHttpResponse(read_range(path, first, last), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Content-Length'] = last - first + 1
+    return response
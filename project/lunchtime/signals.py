@@ -0,0 +1,153 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .autocomplete import prefix_cache
+from .bitmaps import mark_reservation, rebuild_table_day
+from .cache import bump_fragment_version
+from .events import publish_event, reservation_event
+from .kitchen import change_queue
+from .metrics import install_query_recorder
+from .models import Meal, Reservation, Restaurant, Review
+from .ratings import add_rating, remove_rating
+from .search import index_meal, index_restaurant
+
+
+@receiver([post_save, post_delete], sender=Meal)
+def invalidate_menu(sender, instance, **kwargs):
+    """Invalidate cached menu of meal's restaurant."""
+    bump_fragment_version(instance.restaurant_id, 'menu')
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_reviews(sender, instance, **kwargs):
+    """Invalidate cached reviews of review's restaurant."""
+    bump_fragment_version(instance.restaurant_id, 'reviews')
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_restaurant(sender, instance, **kwargs):
+    """Invalidate all cached fragments of restaurant and restaurant names cached for autocomplete."""
+    bump_fragment_version(instance.id, 'menu')
+    bump_fragment_version(instance.id, 'reviews')
+    prefix_cache.clear()
+
+
+@receiver(post_save, sender=Review)
+def add_review_rating(sender, instance, created, **kwargs):
+    """Add rate of new review to restaurant's rating."""
+    if created:
+        add_rating(instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    """Remove rate of deleted review from restaurant's rating."""
+    remove_rating(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def index_restaurant_document(sender, instance, **kwargs):
+    """Keep search document of restaurant up to date."""
+    index_restaurant(instance)
+
+
+@receiver(post_save, sender=Meal)
+def index_meal_document(sender, instance, **kwargs):
+    """Keep search document of meal up to date."""
+    index_meal(instance)
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_stored_reservation(sender, instance, raw, **kwargs):
+    """Remember where and when changed reservation is stored, so handlers of post_save can update its previous
+    table, day and time.
+    """
+    instance._stored = None
+    if instance.pk is not None and not raw:
+        instance._stored = Reservation.objects.filter(pk=instance.pk) \
+            .values('table_id', 'restaurant_id', 'date', 'time').first()
+
+
+@receiver(post_save, sender=Reservation)
+def mark_reservation_slots(sender, instance, created, **kwargs):
+    """Set slots of new reservation in bitmap of its table. Compute bitmaps of table's day again after reservation
+    is changed, also of table and day it was moved from.
+    """
+    if created:
+        mark_reservation(instance)
+        return
+    rebuild_table_day(instance.table_id, instance.restaurant_id, instance.date)
+    stored = getattr(instance, '_stored', None)
+    if stored and (stored['table_id'], stored['date']) != (instance.table_id, instance.date):
+        rebuild_table_day(stored['table_id'], stored['restaurant_id'], stored['date'])
+
+
+@receiver(post_delete, sender=Reservation)
+def clear_reservation_slots(sender, instance, **kwargs):
+    """Compute bitmap of table's day again without deleted reservation."""
+    rebuild_table_day(instance.table_id, instance.restaurant_id, instance.date)
+
+
+@receiver(m2m_changed, sender=Reservation.meal.through)
+def change_prep_queue(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count meals added to or removed from reservation in kitchen's prep queue."""
+    if action == 'pre_clear':
+        pk_set = set(instance.reservation_set.values_list('id', flat=True) if reverse
+                     else instance.meal.values_list('id', flat=True))
+        instance._cleared_pks = pk_set
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        for reservation in Reservation.objects.filter(pk__in=pk_set):
+            change_queue(reservation, [instance.id], sign)
+    else:
+        change_queue(instance, list(pk_set), sign)
+
+
+@receiver(post_save, sender=Reservation)
+def move_in_prep_queue(sender, instance, created, **kwargs):
+    """Move meals of reservation whose day or time changed in kitchen's prep queue."""
+    stored = getattr(instance, '_stored', None)
+    if created or not stored or (stored['restaurant_id'], stored['date'], stored['time']) == (
+            instance.restaurant_id, instance.date, instance.time):
+        return
+    meal_ids = list(instance.meal.values_list('id', flat=True))
+    change_queue(Reservation(id=instance.id, restaurant_id=stored['restaurant_id'], date=stored['date'],
+                             time=stored['time']), meal_ids, -1)
+    change_queue(instance, meal_ids, 1)
+
+
+@receiver(pre_delete, sender=Reservation)
+def remove_from_prep_queue(sender, instance, **kwargs):
+    """Remove meals of cancelled reservation from kitchen's prep queue."""
+    change_queue(instance, list(instance.meal.values_list('id', flat=True)), -1)
+
+
+@receiver(post_save, sender=Reservation)
+def publish_reservation_created(sender, instance, created, **kwargs):
+    """Tell screens of restaurant about new reservation."""
+    if created:
+        publish_event(instance.restaurant_id, 'reservation-created', reservation_event(instance))
+
+
+@receiver(post_delete, sender=Reservation)
+def publish_reservation_cancelled(sender, instance, **kwargs):
+    """Tell screens of restaurant about cancelled reservation."""
+    publish_event(instance.restaurant_id, 'reservation-cancelled', reservation_event(instance))
+
+
+@receiver([post_save, post_delete], sender=Meal)
+def publish_menu_changed(sender, instance, **kwargs):
+    """Tell screens of restaurant that its menu changed."""
+    publish_event(instance.restaurant_id, 'menu-changed', {'meal': instance.id})
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    """Count queries of new database connection into metrics of requests."""
+    install_query_recorder(connection)
@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import os
+import posixpath
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml')
+CONTENT_HASH_LENGTH = 16
+
+
+def precompress(path):
+    """Store gzip, and brotli when it is installed, compressed copies of file next to it, e.g. style.css.gz.
+
+    Copies which aren't smaller than the file are not stored. Return list of paths of stored copies.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed['.br'] = brotli.compress(data)
+    stored = []
+    for extension, content in compressed.items():
+        if len(content) < len(data):
+            with open(path + extension, 'wb') as file:
+                file.write(content)
+            stored.append(path + extension)
+    return stored
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Static files storage which stores files under names with hash of content and precompresses them.
+
+    Until collectstatic has been run, files missing in STATIC_ROOT are linked by their plain names.
+    """
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            return FileSystemStorage.url(self, name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if isinstance(hashed_name, str):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if not dry_run:
+            for hashed_name in hashed_names.values():
+                if os.path.splitext(hashed_name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                    precompress(self.path(hashed_name))
+
+
+class ContentHashedStorage(FileSystemStorage):
+    """File storage which names uploaded files by hash of their content, e.g. media/3f2a9c0d1e4b5a6f.png.
+
+    URL of stored file never changes its content, so it can be cached forever, and identical uploads
+    are stored once.
+    """
+    def save(self, name, content, max_length=None):
+        if content is not None:
+            if not hasattr(content, 'chunks'):
+                content = File(content, name)
+            name = self.content_name(name, content)
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length)
+
+    def content_name(self, name, content):
+        """Return name in the same directory made of hash of content and extension of name."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(directory, digest.hexdigest()[:CONTENT_HASH_LENGTH] + extension)
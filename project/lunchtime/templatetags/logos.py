@@ -0,0 +1,12 @@
+from django import template
+
+from lunchtime.images import rendition_url
+
+register = template.Library()
+
+
+@register.inclusion_tag('lunchtime/logo.html')
+def logo(image, rendition, css_class):
+    """Display picture with WebP and JPEG renditions of image of given size, falling back to the image."""
+    return {'webp': rendition_url(image.name, rendition, 'webp'), 'jpeg': rendition_url(image.name, rendition, 'jpeg'),
+            'css_class': css_class}
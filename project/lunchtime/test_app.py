@@ -1,10 +1,49 @@
+import asyncio
+import base64
+import gzip
+import io
+import json
+import re
 import pytest
 import datetime
+import time as timer
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth.models import User, Permission
-
-from lunchtime.forms import SelectDateAndTimeForm
-from lunchtime.models import Restaurant, Meal, Review, Reservation, Table
+from django.core.cache import cache
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.http import Http404
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from lunchtime import bitmaps
+from lunchtime.benchmark import run_load
+from lunchtime.availability import available_restaurants, free_tables
+from lunchtime.bitmaps import bitmap_drift, slot_mask
+from lunchtime.ratings import rating_drift
+from lunchtime.booking import book_table, TableUnavailable
+from lunchtime.search import fold, search
+from lunchtime.metrics import Budget, BudgetExceeded, prometheus, ring_buffer
+from lunchtime.forms import SelectDateAndTimeForm, SelectRestaurantForm, AddTableForm, AddReviewForm
+from lunchtime.models import Restaurant, Meal, Review, Reservation, Table, TableHold, TableSlots
+from lunchtime.cache import get_or_recompute, menu_snapshots
+from lunchtime.holds import held_by_others, hold_table, release_table
+from lunchtime.images import RENDITIONS, rendition_name, wait_for_renditions
+from lunchtime.events import EventStream, QUEUE_SIZE, local_broker
+from lunchtime.kitchen import change_queue, prep_queue
+from lunchtime.menus import MenuExportStream, MenuFormatError, read_json_rows
+from lunchtime.serving import serve
+from lunchtime.views import RestaurantView, menu_snapshot
 
 
 @pytest.mark.django_db
@@ -246,7 +285,7 @@ def test_list_reservations(client, reservation_list, user):
     response = client.get(url)
     assert response.status_code == 200
     assert Reservation.objects.count() == 3
-    assert list(response.context['object_list']) == list(reservation_list)
+    assert list(response.context['object_list']) == list(reservation_list.order_by('-date', '-time', 'id'))
 
 
 @pytest.mark.django_db
@@ -367,3 +406,876 @@ def test_delete_table(client, table):
     assert response.status_code == 302
     table_ids = [table.id for table in Table.objects.all()]
     assert table_first.id not in table_ids
+
+
+@pytest.mark.django_db
+def test_reservation_end_time(reservation):
+    assert reservation.duration == 60
+    assert reservation.end_time == datetime.time(11, 30)
+
+
+@pytest.mark.django_db
+def test_free_tables_overlapping_reservation(reservation, restaurant, table):
+    today = datetime.date.today()
+    assert table not in free_tables(restaurant.id, today, datetime.time(11, 0))
+    assert table not in free_tables(restaurant.id, today, datetime.time(10, 0))
+    assert table in free_tables(restaurant.id, today, datetime.time(11, 30))
+    assert table in free_tables(restaurant.id, today, datetime.time(9, 30))
+    assert table in free_tables(restaurant.id, today + datetime.timedelta(days=1), datetime.time(11, 0))
+
+
+@pytest.mark.django_db
+def test_free_tables_persons(restaurant, table):
+    assert table in free_tables(restaurant.id, datetime.date.today(), '12:00:00', persons=2)
+    assert table not in free_tables(restaurant.id, datetime.date.today(), '12:00:00', persons=3)
+
+
+@pytest.mark.django_db
+def test_free_tables_single_query(reservation_list, restaurant, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        list(free_tables(restaurant.id, datetime.date.today(), datetime.time(12, 0)))
+
+
+@pytest.mark.django_db
+def test_reserved_table_free_on_other_day(client, user, restaurant, table, meal):
+    client.force_login(user=user)
+    date = datetime.date.today()
+    time = datetime.time(12, 30)
+    response = client.post(f'/add_reservation/{date}/{time}/{restaurant.id}/', {'table_id': table.id,
+                                                                                'meals': [meal.id]})
+    assert response.status_code == 302
+    response = client.get(f'/add_reservation/{date}/{time}/{restaurant.id}/')
+    assert table not in response.context.get('available_tables', [])
+    tomorrow = date + datetime.timedelta(days=1)
+    response = client.get(f'/add_reservation/{tomorrow}/{time}/{restaurant.id}/')
+    assert table in response.context['available_tables']
+
+
+@pytest.mark.django_db
+def test_book_table_conflict(user, restaurant, table, meal):
+    today = datetime.date.today()
+    reservation = book_table(user, restaurant.id, table.id, today, datetime.time(12, 0), [meal])
+    assert list(reservation.meal.all()) == [meal]
+    with pytest.raises(TableUnavailable):
+        book_table(user, restaurant.id, table.id, today, datetime.time(12, 30))
+    book_table(user, restaurant.id, table.id, today, datetime.time(13, 0))
+    assert Reservation.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_add_reservation_conflict(client, user, reservation, restaurant, table):
+    client.force_login(user=user)
+    url = f'/add_reservation/{reservation.date}/{reservation.time}/{restaurant.id}/'
+    response = client.post(url, {'table_id': table.id})
+    assert response.status_code == 409
+    assert client.post(url, {'table_id': '²'}).status_code == 409
+    assert Reservation.objects.count() == 1
+    small = Table.objects.create(persons=2, restaurant=restaurant)
+    large = Table.objects.create(persons=6, restaurant=restaurant)
+    book_table(user, restaurant.id, large.id, reservation.date, reservation.time)
+    response = client.post(f'{url}?persons=6', {'table_id': large.id})
+    assert response.status_code == 409 and response.context['available_tables'] == []
+    response = client.post(f'{url}?persons=2', {'table_id': large.id})
+    assert response.status_code == 409 and response.context['available_tables'] == [small]
+
+
+@pytest.mark.skipif(connection.vendor == 'sqlite', reason='SQLite has no row-level locks')
+@pytest.mark.django_db(transaction=True)
+def test_book_table_concurrent(user, restaurant, table):
+    def book(_):
+        try:
+            book_table(user, restaurant.id, table.id, datetime.date.today(), datetime.time(12, 0))
+            return True
+        except TableUnavailable:
+            return False
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(book, range(200)))
+    assert results.count(True) == 1
+    assert Reservation.objects.filter(table=table).count() == 1
+
+
+@pytest.mark.django_db
+def test_restaurant_details_query_count(client, restaurant, user, django_assert_num_queries):
+    for number in range(10):
+        Meal.objects.create(category=number % 3 + 1, name=f'danie {number}', description='opis', price=20.00,
+                            restaurant=restaurant)
+        Review.objects.create(rate=5, review=f'recenzja {number}', user=user, restaurant=restaurant)
+    url = f'/restaurant/{restaurant.id}/'
+    with django_assert_num_queries(3):
+        client.get(url)
+    with django_assert_num_queries(1):
+        client.get(url)
+
+
+@pytest.mark.django_db
+def test_restaurant_details_cache_invalidation(client, restaurant, meal, review):
+    url = f'/restaurant/{restaurant.id}/'
+    assert 'pizza hawajska' in client.get(url).content.decode()
+    meal.name = 'pizza margherita'
+    meal.save()
+    review.delete()
+    content = client.get(url).content.decode()
+    assert 'pizza margherita' in content
+    assert 'Pysznie!' not in content
+
+
+@pytest.mark.django_db
+def test_list_reservations_pages(client, user, restaurant, table, meals, django_assert_max_num_queries):
+    today = datetime.date.today()
+    for day in range(-5, 45):
+        reservation = Reservation.objects.create(restaurant=restaurant, table=table, user=user, time='12:00:00',
+                                                 date=today + datetime.timedelta(days=day))
+        reservation.meal.set(meals)
+    client.force_login(user=user)
+    listed = []
+    url = '/reservation_list/'
+    while url:
+        with django_assert_max_num_queries(6):
+            response = client.get(url)
+        listed += response.context['object_list']
+        page = response.context['page_obj']
+        url = f'/reservation_list/?cursor={page.next_cursor}' if page.has_next() else None
+    assert listed == list(Reservation.objects.filter(date__gte=today).order_by('-date', '-time', 'id'))
+    response = client.get('/reservation_list/', {'all': 1})
+    assert len(response.context['object_list']) == 20
+    first_page = listed[:20]
+    assert list(client.get('/reservation_list/', {'cursor': 'abc'}).context['object_list']) == first_page
+    crafted = base64.urlsafe_b64encode(b'["abc", "x", 1]').decode()
+    response = client.get('/reservation_list/', {'cursor': crafted})
+    assert response.status_code == 200 and list(response.context['object_list']) == first_page
+    assert client.get('/api/reservations/', {'cursor': crafted}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_review_updates_rating(client, restaurant, user):
+    client.force_login(user=user)
+    for rate in (5, 4, 4):
+        client.post('/add_review/', {'rate': rate, 'review': 'Dobre', 'restaurant': restaurant.id})
+    restaurant.refresh_from_db()
+    assert (restaurant.review_count, restaurant.rating_sum, restaurant.stars_4) == (3, 13, 2)
+    assert restaurant.rating == pytest.approx(13 / 3)
+    for review in Review.objects.all():
+        client.delete(f'/delete_review/{review.id}/')
+    restaurant.refresh_from_db()
+    assert (restaurant.review_count, restaurant.rating_sum, restaurant.stars_4, restaurant.rating) == (0, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_rebuild_ratings(review_list, restaurant):
+    call_command('rebuild_ratings', '--check', stdout=io.StringIO())
+    Restaurant.objects.filter(pk=restaurant.id).update(review_count=1, rating=1.0, stars_5=0)
+    with pytest.raises(CommandError):
+        call_command('rebuild_ratings', '--check', stdout=io.StringIO())
+    call_command('rebuild_ratings', stdout=io.StringIO())
+    restaurant.refresh_from_db()
+    assert (restaurant.review_count, restaurant.rating, restaurant.stars_5) == (3, 4.0, 1)
+    call_command('rebuild_ratings', '--check', stdout=io.StringIO())
+
+
+@pytest.mark.django_db
+def test_list_restaurants_by_rating(client, restaurant_list):
+    Restaurant.objects.filter(name='Frutti di Mare').update(rating=4.5, review_count=2)
+    response = client.get('/restaurant_list/', {'sort': 'rating', 'min_rating': 4})
+    assert [restaurant.name for restaurant in response.context['object_list']] == ['Frutti di Mare']
+
+
+@pytest.mark.django_db
+def test_list_restaurants_pages(client, user, django_assert_max_num_queries):
+    for number in range(45):
+        Restaurant.objects.create(name=f'Restauracja {number % 7}', address='Rynek 1', phone='123',
+                                  email='r@krakow.pl', description='opis', owner=user)
+    listed = []
+    url = '/restaurant_list/'
+    while url:
+        with django_assert_max_num_queries(1):
+            response = client.get(url)
+        listed += response.context['object_list']
+        page = response.context['page_obj']
+        url = f'/restaurant_list/?cursor={page.next_cursor}' if page.has_next() else None
+    assert listed == list(Restaurant.objects.order_by('name', 'id'))
+
+
+@pytest.mark.django_db
+def test_list_restaurants_filters(client, restaurant_list):
+    first, second, third = restaurant_list
+    Meal.objects.create(category=2, name='pizza', description='parma', price=26.00, restaurant=first)
+    Meal.objects.create(category=2, name='ośmiornica', description='grillowana', price=80.00, restaurant=second)
+    response = client.get('/restaurant_list/', {'min_price': 20, 'max_price': 30})
+    assert list(response.context['object_list']) == [first]
+    Restaurant.objects.filter(pk=third.pk).update(opens_at=datetime.time(0, 0, 1), closes_at=datetime.time(0, 0))
+    Restaurant.objects.exclude(pk=third.pk).update(opens_at=datetime.time(0, 0), closes_at=datetime.time(0, 0))
+    response = client.get('/restaurant_list/', {'open_now': 'on'})
+    assert list(response.context['object_list']) == [Restaurant.objects.get(pk=third.pk)]
+
+
+def test_restaurant_open_after_midnight():
+    restaurant = Restaurant(opens_at=datetime.time(18, 0), closes_at=datetime.time(2, 0))
+    assert restaurant.is_open(datetime.time(23, 0))
+    assert restaurant.is_open(datetime.time(1, 0))
+    assert not restaurant.is_open(datetime.time(12, 0))
+
+
+def test_fold():
+    assert fold('Śniadanie i PIECZEŃ z łososia') == 'sniadanie i pieczen z lososia'
+
+
+@pytest.mark.django_db
+def test_search(client, restaurant, menu_breakfast, menu_dinner):
+    response = client.get('/search/', {'q': 'pieczen'})
+    assert response.status_code == 200
+    assert [result.meal for result in response.context['results']] == [menu_dinner]
+    assert [result.restaurant for result in search('trattoria')] == [restaurant]
+    assert [result.meal for result in search('Sałatka owoc')] == [menu_breakfast]
+    assert search('') == []
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes(restaurant, meal):
+    meal.name = 'żurek'
+    meal.save()
+    assert search('hawajska') == []
+    assert [result.meal for result in search('zurek')] == [meal]
+    meal.delete()
+    assert search('zurek') == []
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    assert [result.restaurant for result in search('makarony')] == [restaurant]
+
+
+@pytest.mark.django_db
+def test_restaurant_autocomplete(client, restaurant_list, django_assert_num_queries):
+    Restaurant.objects.create(name='Łódka', address='Wiślna 2', phone='123', email='lodka@krakow.pl',
+                              description='Ryby', owner=User.objects.get(username='username1'))
+    response = client.get('/restaurant_autocomplete/', {'q': 'lod'})
+    assert response.json() == {'results': [{'id': Restaurant.objects.get(name='Łódka').id, 'name': 'Łódka'}]}
+    response = client.get('/restaurant_autocomplete/', {'q': 'TRATT'})
+    assert [result['name'] for result in response.json()['results']] == ['Trattoria Parma']
+    with django_assert_num_queries(0):
+        client.get('/restaurant_autocomplete/', {'q': 'tratt'})
+    assert client.get('/restaurant_autocomplete/', {'q': ' '}).json() == {'results': []}
+
+
+@pytest.mark.django_db
+def test_restaurant_picker_does_not_list_restaurants(restaurant_list, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        SelectRestaurantForm().as_p()
+        AddTableForm().as_p()
+    first = restaurant_list[0]
+    with django_assert_num_queries(1):
+        assert first.name in AddReviewForm(initial={'restaurant': first.id}).as_p()
+
+
+@pytest.mark.django_db
+def test_available_restaurants(restaurant_list, user):
+    first, second, third = restaurant_list
+    today = datetime.date.today()
+    Table.objects.create(persons=2, restaurant=first)
+    table = Table.objects.create(persons=4, restaurant=second)
+    Table.objects.create(persons=6, restaurant=third)
+    Restaurant.objects.filter(pk=third.pk).update(rating=5.0)
+    Reservation.objects.create(restaurant=second, table=table, date=today, time='12:00:00', user=user)
+    assert list(available_restaurants(today, datetime.time(12, 30), persons=2)) == [third, first]
+    assert list(available_restaurants(today, datetime.time(12, 30), persons=3)) == [third]
+    assert list(available_restaurants(today, datetime.time(13, 0), persons=3)) == [third, second]
+    assert list(available_restaurants(today, datetime.time(21, 0))) == []
+
+
+@pytest.mark.django_db
+def test_select_restaurant_latency(client, user, django_assert_max_num_queries):
+    today = datetime.date.today()
+    for number in range(50):
+        restaurant = Restaurant.objects.create(name=f'Restauracja {number}', address='Rynek 1', phone='123',
+                                               email='r@krakow.pl', description='opis', owner=user)
+        for persons in (2, 4, 6):
+            table = Table.objects.create(persons=persons, restaurant=restaurant)
+            Reservation.objects.create(restaurant=restaurant, table=table, date=today, time='12:00:00', user=user)
+    client.force_login(user=user)
+    start = timer.perf_counter()
+    with django_assert_max_num_queries(5):
+        response = client.get(f'/select_restaurant/{today}/12:30:00/', {'persons': 2})
+    assert timer.perf_counter() - start < 0.5
+    assert list(response.context['restaurants']) == []
+    response = client.get(f'/select_restaurant/{today}/13:00:00/', {'persons': 5})
+    assert len(response.context['restaurants']) == 50
+    assert client.get(f'/select_restaurant/{today}/13:00:00/', {'persons': '²'}).status_code == 200
+
+
+def test_slot_mask():
+    assert slot_mask(datetime.time(0, 0), datetime.time(0, 15)) == 0b1
+    assert slot_mask(datetime.time(10, 30), datetime.time(11, 30)) == 0b1111 << 42
+    assert slot_mask(datetime.time(10, 40), datetime.time(11, 10)) == 0b111 << 42
+    assert slot_mask(datetime.time(23, 0), datetime.time(23, 59, 59)) == 0b1111 << 92
+
+
+@pytest.mark.django_db
+def test_bitmaps_follow_reservations(client, user, reservation_list, restaurant, table):
+    today = datetime.date.today()
+    assert bitmap_drift() == []
+    assert bitmaps.free_tables(restaurant.id, today, '13:00:00') == [table]
+    assert bitmaps.free_tables(restaurant.id, today, '12:30:00') == []
+    client.force_login(user=user)
+    client.delete(f'/delete_reservation/{reservation_list.get(time="12:00:00").id}/')
+    assert bitmaps.free_tables(restaurant.id, today, '12:30:00') == [table]
+    assert bitmap_drift() == []
+    other = Table.objects.create(persons=2, restaurant=restaurant)
+    moved = reservation_list.first()
+    moved.table, moved.date = other, today + datetime.timedelta(days=1)
+    moved.save()
+    assert bitmap_drift() == []
+
+
+@pytest.mark.django_db
+def test_check_availability_bitmaps(reservation, table):
+    call_command('check_availability_bitmaps', stdout=io.StringIO())
+    TableSlots.objects.all().delete()
+    with pytest.raises(CommandError):
+        call_command('check_availability_bitmaps', stdout=io.StringIO())
+    call_command('check_availability_bitmaps', '--fix', stdout=io.StringIO())
+    assert bitmap_drift() == []
+
+
+@pytest.mark.django_db
+def test_metrics_recorded(client, restaurant, settings):
+    settings.LUNCHTIME_METRICS_SINKS = ['lunchtime.metrics.ring_buffer', 'lunchtime.metrics.prometheus']
+    ring_buffer.clear()
+    prometheus.clear()
+    client.get(f'/restaurant/{restaurant.id}/')
+    metrics, = ring_buffer.records('restaurant-details')
+    assert (metrics.method, metrics.status, metrics.violations) == ('GET', 200, [])
+    assert metrics.queries > 0
+    assert 0 < metrics.template_time <= metrics.wall_time
+    assert 0 < metrics.db_time <= metrics.wall_time
+    settings.LUNCHTIME_METRICS_TOKEN = 'scraper-token'
+    response = client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scraper-token')
+    assert response['Content-Type'].startswith('text/plain')
+    assert 'lunchtime_requests_total{view="restaurant-details"} 1' in response.content.decode()
+    assert client.get('/metrics/').status_code == 403
+    assert client.get('/metrics/', HTTP_AUTHORIZATION='Bearer other').status_code == 403
+    assert client.get('/metrics/', HTTP_AUTHORIZATION='Bearer é').status_code == 403
+    client.force_login(User.objects.create_user(username='admin', is_staff=True))
+    assert client.get('/metrics/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_budget_exceeded(client, restaurant, settings, monkeypatch, caplog):
+    monkeypatch.setattr(RestaurantView, 'budget', Budget(queries=1))
+    with pytest.raises(BudgetExceeded, match='restaurant-details exceeded budget: queries'):
+        client.get(f'/restaurant/{restaurant.id}/')
+    settings.LUNCHTIME_BUDGETS_RAISE = False
+    assert client.get(f'/restaurant/{restaurant.id}/').status_code == 200
+    assert 'restaurant-details exceeded budget' in caplog.text
+
+
+@pytest.mark.django_db
+def test_booking_load_scenarios(seeded_data):
+    result = run_load(scenarios=4, concurrency=1, seed=1)
+    assert result.errors == []
+    assert result.outcomes['booked'] + result.outcomes['full'] == 4
+    assert Reservation.objects.filter(date__gt=datetime.date.today()).count() == result.outcomes['booked']
+    assert result.percentiles('select_restaurant')[0] > 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('seeded_data', ['tiny'], indirect=True)
+def test_seed_database(seeded_data):
+    assert dict(seeded_data.rows) == {'users': 2, 'restaurants': 3, 'tables': 6, 'meals': 12, 'reviews': 6,
+                                      'reservations': 72, 'reservation meals': Reservation.meal.through.objects.count(),
+                                      'table slots': 24, 'ratings': 3, 'search documents': 15}
+    assert Reservation.objects.count() == 72
+    intervals = defaultdict(list)
+    for table_id, date, time, end_time in Reservation.objects.values_list('table_id', 'date', 'time', 'end_time'):
+        intervals[table_id, date].append((time, end_time))
+    assert all(end <= start for booked in intervals.values()
+               for (_, end), (start, _) in zip(sorted(booked), sorted(booked)[1:]))
+    assert all(meal.restaurant_id == reservation.restaurant_id for reservation in Reservation.objects.all()
+               for meal in reservation.meal.all())
+    assert bitmap_drift() == []
+    assert rating_drift() == []
+    assert search('pierogi') or search('zupa') or search('bigos')
+    assert Restaurant.objects.filter(name_folded='').count() == 0
+
+
+@pytest.mark.django_db
+def test_seed_command():
+    out = io.StringIO()
+    call_command('seed_lunchtime', scale='tiny', seed=3, stdout=out)
+    assert 'rows/s' in out.getvalue()
+    with pytest.raises(CommandError):
+        call_command('seed_lunchtime', scale='tiny', stdout=out)
+
+
+async def asgi_get(path):
+    return await AsyncClient().get(path)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_asgi(restaurant, meals, table):
+    response = async_to_sync(asgi_get)(f'/api/restaurants/{restaurant.id}/meals/?fields=name')
+    assert response.json()['results'] == [{'name': 'pizza'}, {'name': 'pizza hawajska'}]
+    assert async_to_sync(asgi_get)('/api/restaurants/0/').status_code == 404
+    details = async_to_sync(asgi_get)(f'/api/restaurants/{restaurant.id}/details/').json()
+    assert (details['name'], details['reviews']) == ('La Trattoria', [])
+    assert [meal['name'] for meal in details['meals']] == ['pizza', 'pizza hawajska']
+    assert [(row['id'], row['persons']) for row in details['tables']] == [(table.id, 2)]
+    menu = async_to_sync(asgi_get)(f'/api/restaurants/{restaurant.id}/menu/').json()['menu']
+    assert [meal['name'] for meal in menu['lunch']] == ['pizza', 'pizza hawajska'] and menu['śniadanie'] == []
+    assert async_to_sync(asgi_get)('/api/restaurants/0/details/').status_code == 404
+    assert async_to_sync(asgi_get)('/api/restaurants/0/menu/').status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_availability_json(client, restaurant, table, reservation):
+    today = datetime.date.today()
+    data = client.get(f'/api/availability/{today}/12:00/', {'persons': 2}).json()
+    assert data['restaurants'] == [{'id': restaurant.id, 'name': 'La Trattoria', 'rating': 0}]
+    assert client.get(f'/api/availability/{today}/10:45/').json()['restaurants'] == []
+    assert client.get(f'/api/availability/{today}/12:00/', {'persons': 3}).json()['restaurants'] == []
+    response = client.get(f'/api/availability/{today}/12:00/', {'persons': '9' * 20}).json()
+    assert (response['persons'], response['restaurants']) == (100, [])
+    assert client.get(f'/api/availability/{today}/12:00/', {'persons': '²'}).json()['persons'] == 1
+    assert client.get('/api/availability/2026-13-45/12:00/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_api_sparse_fields(client, restaurant, meals):
+    with CaptureQueriesContext(connection) as queries:
+        data = client.get('/api/restaurants/', {'fields': 'id,name'}).json()
+    assert data == {'results': [{'id': restaurant.id, 'name': 'La Trattoria'}], 'next': None}
+    assert 'address' not in queries.captured_queries[-1]['sql']
+    data = client.get(f'/api/restaurants/{restaurant.id}/meals/', {'fields': 'name,price'}).json()
+    assert data['results'] == [{'name': 'pizza', 'price': '26.00'}, {'name': 'pizza hawajska', 'price': '28.00'}]
+    response = client.get('/api/restaurants/', {'fields': 'id,password'})
+    assert response.status_code == 400
+    assert response.json() == {'error': 'Nieznane pola: password.'}
+    assert client.get('/api/restaurants/0/').status_code == 404
+    assert client.get(f'/api/restaurants/{restaurant.id}/tables/').json() == {'results': [], 'next': None}
+    for resource in ('meals', 'tables', 'reviews'):
+        assert client.get(f'/api/restaurants/0/{resource}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_api_keyset_pages(client, restaurant_list):
+    first = client.get('/api/restaurants/', {'fields': 'name'}).json()
+    assert first['next'] is None
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr('lunchtime.views.RestaurantsApiView.page_size', 1)
+        first = client.get('/api/restaurants/', {'fields': 'name'}).json()
+        second = client.get('/api/restaurants/', {'fields': 'name', 'cursor': first['next']}).json()
+    assert first['results'][0]['name'] < second['results'][0]['name']
+    assert client.get('/api/restaurants/', {'cursor': 'x'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_etag(client, restaurant, review):
+    path = f'/api/restaurants/{restaurant.id}/'
+    response = client.get(path)
+    etag = response['ETag']
+    assert etag.startswith('"')
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert len(queries) == 1
+    assert client.get(path, {'fields': 'name'})['ETag'] != etag
+    Restaurant.objects.filter(pk=restaurant.id).update(name='Trattoria',
+                                                       updated_at=timezone.now() + datetime.timedelta(days=1))
+    assert client.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    path = f'/api/restaurants/{restaurant.id}/reviews/'
+    etag = client.get(path)['ETag']
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert len(queries) == 0
+    Review.objects.create(rate=1, review='Za głośno', user=review.user, restaurant=restaurant)
+    assert client.get(path, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_api_reservations(client, user, reservation):
+    assert client.get('/api/reservations/').status_code == 302
+    client.force_login(user=user)
+    data = client.get('/api/reservations/', {'fields': 'id,restaurant_name,time'}).json()
+    assert data['results'] == [{'id': reservation.id, 'restaurant_name': 'La Trattoria', 'time': '10:30:00'}]
+
+
+@pytest.mark.django_db
+def test_menu_snapshot(client, user, restaurant, restaurant_list, meals, table):
+    menu_snapshots.clear()
+    user.user_permissions.add(Permission.objects.get(codename='change_meal'))
+    client.force_login(user=user)
+    url = f'/add_reservation/{datetime.date.today()}/12:30:00/{restaurant.id}/'
+    assert client.get(url).context['menu'] == menu_snapshot(restaurant.id)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert 'pizza hawajska' in response.content.decode()
+    assert not [query for query in queries.captured_queries if 'lunchtime_meal' in query['sql']]
+    assert menu_snapshots.stats() == {'hits': 2, 'misses': 1}
+    other = Restaurant.objects.exclude(pk=restaurant.id).first()
+    meal = Meal.objects.get(name='pizza hawajska')
+    client.post(f'/modify_meal/{meal.id}/', {'restaurant': other.id, 'category': 2, 'name': meal.name,
+                                             'description': meal.description, 'price': meal.price})
+    assert [meal.name for meal in menu_snapshot(restaurant.id)] == ['pizza']
+    assert [meal.name for meal in menu_snapshot(other.id)] == ['pizza hawajska']
+    assert menu_snapshots.stats() == {'hits': 2, 'misses': 3}
+    client.force_login(User.objects.create_user(username='admin', is_staff=True))
+    assert 'lunchtime_menu_snapshot_misses_total 3' in client.get('/metrics/').content.decode()
+
+
+def test_recompute_single_flight():
+    calls = []
+
+    def compute():
+        calls.append(True)
+        timer.sleep(0.2)
+        return len(calls)
+
+    def read(_):
+        return get_or_recompute('lunchtime:test', compute, 60)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        assert list(pool.map(read, range(32))) == [1] * 32
+    assert len(calls) == 1
+    cache.set('lunchtime:test', (1, None, timer.time() - 1, 0.2), 60)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        values = list(pool.map(read, range(32)))
+    assert len(calls) == 2
+    assert set(values) <= {1, 2} and values.count(1) >= 16
+    assert read(None) == 2
+
+
+def test_recompute_early_and_on_version(monkeypatch):
+    monkeypatch.setattr('lunchtime.cache.random.random', lambda: 0.99)
+    cache.set('lunchtime:test', ('old', 1, timer.time() + 10, 1.0), 60)
+    assert get_or_recompute('lunchtime:test', lambda: 'new', 60, version=1, beta=1.0) == 'old'
+    assert get_or_recompute('lunchtime:test', lambda: 'new', 60, version=1, beta=3.0) == 'new'
+    assert get_or_recompute('lunchtime:test', lambda: 'newer', 60, version=1, beta=0) == 'new'
+    assert get_or_recompute('lunchtime:test', lambda: 'newer', 60, version=2, beta=0) == 'newer'
+
+
+def test_recompute_keeps_lock_of_other_caller():
+    cache.add('lunchtime:test:lock', 'other', 60)
+    assert get_or_recompute('lunchtime:test', lambda: 'value', 60, lock_timeout=0.1) == 'value'
+    assert cache.get('lunchtime:test:lock') == 'other'
+    cache.delete('lunchtime:test:lock')
+
+
+@pytest.mark.django_db
+def test_table_holds(user, restaurant):
+    other = User.objects.create_user(username='other')
+    first = Table.objects.create(persons=2, restaurant=restaurant)
+    second = Table.objects.create(persons=2, restaurant=restaurant)
+    date = datetime.date.today()
+    assert hold_table(user.id, first.id, date, datetime.time(12, 0))
+    assert hold_table(user.id, first.id, date, datetime.time(12, 30))
+    assert not hold_table(other.id, first.id, date, datetime.time(12, 45))
+    assert hold_table(other.id, first.id, date, datetime.time(13, 30))
+    assert hold_table(other.id, second.id, date, datetime.time(12, 0))
+    assert held_by_others(other.id, [first.id, second.id], date, datetime.time(11, 30)) == {first.id}
+    release_table(user.id, first.id, date, datetime.time(12, 0))
+    assert held_by_others(other.id, [first.id, second.id], date, datetime.time(11, 30)) == set()
+    assert held_by_others(user.id, [first.id, second.id], date, datetime.time(11, 30)) == {second.id}
+
+
+@pytest.mark.django_db
+def test_booking_wizard(client, user, restaurant, table):
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    client.force_login(user=user)
+    response = client.post('/select_date_time/', {'date': date, 'time': '12:30', 'persons': 2})
+    assert response['Location'] == f'/select_restaurant/{date}/12:30:00/?persons=2'
+    assert client.session['lunchtime_booking'] == {'date': str(date), 'time': '12:30:00', 'persons': 2}
+    response = client.post(response['Location'], {'restaurant': restaurant.id})
+    assert client.session['lunchtime_booking']['restaurant_id'] == restaurant.id
+    assert client.get(response['Location']).context['held_table'] == table.id
+    other = Client()
+    other.force_login(User.objects.create_user(username='other', password='password'))
+    url = f'/add_reservation/{date}/12:30:00/{restaurant.id}/?persons=2'
+    assert 'Brak wolnych stolików' in other.get(url).content.decode()
+    assert other.post(url, {'table_id': table.id}).status_code == 409
+    assert client.post(url, {'table_id': table.id}).status_code == 302
+    assert 'lunchtime_booking' not in client.session
+    assert held_by_others(0, [table.id], date, datetime.time(12, 30)) == set()
+
+
+@pytest.mark.skipif(connection.vendor == 'sqlite', reason='SQLite locks whole database for concurrent writes')
+@pytest.mark.django_db(transaction=True)
+def test_table_holds_concurrent(restaurant):
+    users = [User.objects.create_user(username=f'holder{number}') for number in range(8)]
+    tables = [Table.objects.create(persons=2, restaurant=restaurant) for _ in range(len(users) + 1)]
+    date = datetime.date.today()
+
+    def hold(args):
+        user, table = args
+        try:
+            return hold_table(user.id, table.id, date, datetime.time(12, 0))
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert sum(executor.map(hold, [(user, tables[0]) for user in users])) == 1
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(hold, zip(users, tables[1:])))
+    holder = TableHold.objects.filter(table=tables[0]).first().user
+    assert list(available_restaurants(date, datetime.time(12, 30))) == []
+    assert list(available_restaurants(date, datetime.time(12, 30), user=holder)) == [restaurant]
+    assert list(available_restaurants(date, datetime.time(14, 0))) == [restaurant]
+
+
+@pytest.mark.django_db
+def test_sweep_table_holds(user, table):
+    date = datetime.date.today()
+    assert hold_table(user.id, table.id, date, datetime.time(12, 0), timeout=-1)
+    assert hold_table(user.id, table.id, date, datetime.time(15, 0))
+    out = io.StringIO()
+    call_command('sweep_table_holds', batch_size=3, stdout=out)
+    assert out.getvalue() == 'Deleted 4 expired holds.\n'
+    assert TableHold.objects.count() == 4
+    other = User.objects.create_user(username='other')
+    assert not hold_table(other.id, table.id, date, datetime.time(15, 30))
+    assert hold_table(other.id, table.id, date, datetime.time(12, 0))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_logo_renditions(client, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = User.objects.create_user(username='owner', password='password')
+    user.user_permissions.add(Permission.objects.get(codename='add_restaurant'))
+    client.force_login(user=user)
+    upload = io.BytesIO()
+    Image.effect_noise((1600, 1200), 64).convert('RGB').save(upload, 'JPEG', quality=95)
+    logo = SimpleUploadedFile('logo.jpg', upload.getvalue(), content_type='image/jpeg')
+    response = client.post('/add_restaurant/', {'name': 'La Trattoria', 'address': 'Dąbrowskiego 3',
+                                                'phone': '124568765', 'email': 'trattoria@krakow.pl',
+                                                'description': 'Wspaniałe makarony!', 'logo': logo})
+    assert response.status_code == 302
+    wait_for_renditions(timeout=10)
+    name = Restaurant.objects.get().logo.name
+    for rendition, size in RENDITIONS.items():
+        for extension in ('webp', 'jpeg'):
+            path = tmp_path / rendition_name(name, rendition, extension)
+            with Image.open(path) as image:
+                assert max(image.size) == max(size)
+            assert path.stat().st_size * 10 < len(upload.getvalue())
+    content = client.get('/restaurant_list/').content.decode()
+    assert f'/media/{rendition_name(name, "list", "webp")}' in content
+    assert f'/media/{rendition_name(name, "list", "jpeg")}' in content
+    renditioned = rendition_name(name, 'list', 'jpeg')
+    monkeypatch.setitem(RENDITIONS, 'list', (200, 200))
+    assert rendition_name(name, 'list', 'jpeg') != renditioned
+
+
+def test_content_hashed_media(settings, tmp_path, rf):
+    settings.MEDIA_ROOT = str(tmp_path)
+    name = default_storage.save('media/logo.png', ContentFile(b'logo'))
+    assert re.fullmatch(r'media/[0-9a-f]{16}\.png', name)
+    assert default_storage.save('media/other.PNG', ContentFile(b'logo')) == name
+    response = serve(rf.get(f'/media/{name}'), name, str(tmp_path))
+    assert b''.join(response.streaming_content) == b'logo'
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert serve(rf.get('/', HTTP_IF_NONE_MATCH=response['ETag']), name, str(tmp_path)).status_code == 304
+    response = serve(rf.get('/', HTTP_RANGE='bytes=1-2'), name, str(tmp_path))
+    assert (response.status_code, response['Content-Range']) == (206, 'bytes 1-2/4')
+    assert b''.join(response.streaming_content) == b'og'
+    assert b''.join(serve(rf.get('/', HTTP_RANGE='bytes=-1'), name, str(tmp_path)).streaming_content) == b'o'
+    assert serve(rf.get('/', HTTP_RANGE='bytes=4-'), name, str(tmp_path)).status_code == 416
+    with pytest.raises(Http404):
+        serve(rf.get('/'), '../logo.png', str(tmp_path / 'media'))
+
+
+def test_precompressed_static(settings, tmp_path, rf):
+    settings.STATIC_ROOT = str(tmp_path)
+    call_command('collectstatic', interactive=False, verbosity=0)
+    name = staticfiles_storage.stored_name('style.css')
+    assert re.fullmatch(r'style\.[0-9a-f]{12}\.css', name)
+    response = serve(rf.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), name, str(tmp_path))
+    assert (response['Content-Encoding'], response['Vary']) == ('gzip', 'Accept-Encoding')
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+    css = (tmp_path / name).read_bytes()
+    assert gzip.decompress(b''.join(response.streaming_content)) == css
+    response = serve(rf.get('/'), name, str(tmp_path))
+    assert 'Content-Encoding' not in response and b''.join(response.streaming_content) == css
+    assert serve(rf.get('/'), 'style.css', str(tmp_path))['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_kitchen_prep_queue(client, user, restaurant, meals, table):
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    first, second = meals
+    Reservation.objects.create(restaurant=restaurant, table=table, date=date, time='12:05', user=user).meal.set(meals)
+    assert prep_queue(restaurant.id, date) == [{'time': '12:00', 'meals': [
+        {'id': second.id, 'name': 'pizza', 'count': 1}, {'id': first.id, 'name': 'pizza hawajska', 'count': 1}]}]
+    reservation = book_table(user, restaurant.id, table.id, date, datetime.time(14, 0), meals=[first])
+    book_table(user, restaurant.id, Table.objects.create(persons=2, restaurant=restaurant).id, date,
+               datetime.time(12, 0), meals=[first])
+    with CaptureQueriesContext(connection) as queries:
+        queue = prep_queue(restaurant.id, date)
+    assert len(queries) == 0
+    assert queue == [
+        {'time': '12:00', 'meals': [{'id': first.id, 'name': 'pizza hawajska', 'count': 2},
+                                    {'id': second.id, 'name': 'pizza', 'count': 1}]},
+        {'time': '14:00', 'meals': [{'id': first.id, 'name': 'pizza hawajska', 'count': 1}]}]
+    assert prep_queue(restaurant.id, date, since=datetime.time(13, 0)) == queue[1:]
+    cache.clear()
+    assert prep_queue(restaurant.id, date) == queue
+    change_queue(reservation, [first.id], 1)
+    assert prep_queue(restaurant.id, date) == queue
+    reservation.time = datetime.time(13, 0)
+    reservation.save()
+    moved = {'time': '13:00', 'meals': [{'id': first.id, 'name': 'pizza hawajska', 'count': 1}]}
+    assert prep_queue(restaurant.id, date) == [queue[0], moved]
+    reservation.date += datetime.timedelta(days=1)
+    reservation.save()
+    assert (prep_queue(restaurant.id, date), prep_queue(restaurant.id, reservation.date)) == (queue[:1], [moved])
+    reservation.delete()
+    client.login(username='username4', password='password4')
+    response = client.get(f'/api/restaurants/{restaurant.id}/kitchen/', {'date': date.isoformat()})
+    assert response.json() == {'restaurant': restaurant.id, 'date': date.isoformat(), 'slots': queue[:1]}
+    assert client.get(f'/api/restaurants/{restaurant.id}/kitchen/', {'date': 'jutro'}).status_code == 400
+    User.objects.create_user(username='cook', password='password')
+    client.login(username='cook', password='password')
+    assert client.get(f'/api/restaurants/{restaurant.id}/kitchen/').status_code == 403
+
+
+def cookie_headers(cookies):
+    """Return ASGI headers which send cookies of test client."""
+    return [(b'cookie', cookies.output(header='', sep=';').encode())] if cookies else []
+
+
+async def read_stream(application, path, actions, cookies=None):
+    """Connect to event stream, run sync actions one by one and return body sent after each of them."""
+    sent, disconnected = asyncio.Queue(), asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': cookie_headers(cookies)}
+    task = asyncio.ensure_future(application(scope, receive, sent.put))
+    messages = [await sent.get(), await sent.get()]
+    if messages[0]['status'] == 200:
+        messages.append(await sent.get())
+        for action in actions:
+            await sync_to_async(action)()
+            message = await sent.get()
+            while message['body'].startswith(b':'):
+                message = await sent.get()
+            messages.append(message)
+    disconnected.set()
+    await task
+    return [messages[0]['status']] + [message['body'].decode() for message in messages[1:]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restaurant_event_stream(client, user, restaurant, meal, table):
+    application = EventStream(None, heartbeat=0.01)
+    path = f'/events/restaurants/{restaurant.id}/'
+    assert async_to_sync(read_stream)(application, path, []) == [403, 'Brak dostępu.']
+    client.force_login(User.objects.create_user(username='guest', password='guest'))
+    assert async_to_sync(read_stream)(application, path, [], client.cookies) == [403, 'Brak dostępu.']
+    client.force_login(restaurant.owner)
+    date = datetime.date.today() + datetime.timedelta(days=1)
+    reservations = []
+
+    def book():
+        reservation = book_table(user, restaurant.id, table.id, date, datetime.time(12, 0), [meal])
+        reservations.append((reservation, reservation.id))
+
+    status, retry, heartbeat, created, changed, cancelled = async_to_sync(read_stream)(application, path, [
+        book, lambda: Meal.objects.filter(pk=meal.pk).first().save(), lambda: reservations[0][0].delete()],
+        client.cookies)
+    assert (status, retry, heartbeat) == (200, 'retry: 5000\n\n', ': keep-alive\n\n')
+    data = f'{{"id": {reservations[0][1]}, "table": {table.id}, "date": "{date}", "time": "12:00:00", ' \
+           f'"duration": 60}}'
+    assert created == f'event: reservation-created\ndata: {data}\n\n'
+    assert changed == f'event: menu-changed\ndata: {{"meal": {meal.id}}}\n\n'
+    assert cancelled == f'event: reservation-cancelled\ndata: {data}\n\n'
+    assert local_broker.subscriber_count() == 0
+    assert async_to_sync(read_stream)(application, '/events/restaurants/0/', []) == [404, 'Nie ma takiej restauracji.']
+
+
+def test_event_subscription_overflow():
+    async def overflow():
+        subscription = local_broker.subscribe('test')
+        for number in range(QUEUE_SIZE + 1):
+            local_broker.publish('test', str(number))
+        await asyncio.sleep(0)
+        messages = [await subscription.get(timeout=1) for _ in range(QUEUE_SIZE)]
+        local_broker.unsubscribe(subscription)
+        return messages
+
+    messages = async_to_sync(overflow)()
+    assert messages[-1] is None and messages[:3] == ['1', '2', '3']
+    assert local_broker.subscriber_count('test') == 0
+
+
+@pytest.mark.django_db
+def test_menu_import_export(client, user, restaurant, meal):
+    user.user_permissions.add(*Permission.objects.filter(codename__in=['add_meal', 'change_meal']))
+    client.force_login(user=user)
+    url = f'/import_menu/{restaurant.id}/'
+    upload = SimpleUploadedFile('menu.csv', f'id,category,name,description,price\n{meal.id},2,pizza parma,pizza,30.50\n'
+                                            f',śniadanie,żurek,zupa na zakwasie,14\n'.encode())
+    response = client.post(url, {'file': upload})
+    assert (response.context['result'].created, response.context['result'].updated) == (1, 1)
+    assert [(meal.category, meal.name, str(meal.price)) for meal in Meal.objects.order_by('category')] == [
+        (1, 'żurek', '14.00'), (2, 'pizza parma', '30.50')]
+    assert [document.meal.name for document in search('zurek')] == ['żurek']
+    upload = SimpleUploadedFile('menu.json', f'[{{"category": 1, "name": "bigos", "description": "kapusta", '
+                                             f'"price": "drogo"}}, {{"id": {meal.id}, "name": "pizza"}}, '
+                                             f'{{"id": 0, "category": 1, "name": "bigos", "description": "kapusta", '
+                                             f'"price": 20}}]'.encode())
+    response = client.post(url, {'file': upload})
+    assert response.status_code == 400 and response.context['result'].errors == [
+        (1, 'Cena: Enter a number.'),
+        (2, 'Kategoria: This field is required. Opis: This field is required. Cena: This field is required.'),
+        (3, 'id: Restauracja nie ma posiłku 0.')]
+    assert Meal.objects.count() == 2
+    response = client.post(url, {'file': SimpleUploadedFile('menu.json', b'{"name": "bigos"}')})
+    assert response.context['form'].errors == {'file': ['Plik JSON musi zawierać listę posiłków.']}
+    response = client.get(f'/export_menu/{restaurant.id}/')
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    assert b''.join(response.streaming_content).decode().splitlines()[1] == f'{Meal.objects.get(category=1).id},1,' \
+                                                                            f'żurek,zupa na zakwasie,14.00'
+    exported = b''.join(client.get(f'/export_menu/{restaurant.id}/', {'format': 'json'}).streaming_content)
+    assert [row['name'] for row in json.loads(exported)] == ['żurek', 'pizza parma']
+    response = client.post(url, {'file': SimpleUploadedFile('menu.json', exported)})
+    assert (response.context['result'].created, response.context['result'].updated) == (0, 2)
+    client.force_login(user=User.objects.create_user(username='cook'))
+    assert client.get(f'/export_menu/{restaurant.id}/').status_code == 403
+
+
+async def asgi_request(application, path, query_string=b'', cookies=None):
+    """Send GET request to ASGI application and return status and body of its response."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query_string,
+             'headers': cookie_headers(cookies), 'server': ('testserver', 80)}
+    await application(scope, receive, send)
+    return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_menu_export_asgi(client, user, restaurant, meals):
+    application = MenuExportStream(ASGIHandler(), chunk_size=1)
+    path = f'/export_menu/{restaurant.id}/'
+    assert async_to_sync(asgi_request)(application, path)[0] == 302
+    client.force_login(user)
+    expected = b''.join(client.get(path, {'format': 'json'}).streaming_content)
+    assert [row['name'] for row in json.loads(expected)] == ['pizza', 'pizza hawajska']
+    assert async_to_sync(asgi_request)(application, path, b'format=json', client.cookies) == (200, expected)
+    expected = b''.join(client.get(path).streaming_content)
+    assert async_to_sync(asgi_request)(application, path, b'', client.cookies) == (200, expected)
+    assert async_to_sync(asgi_request)(application, path, b'format=xml', client.cookies)[0] == 400
+
+
+def test_read_json_rows(monkeypatch):
+    monkeypatch.setattr('lunchtime.menus.READ_SIZE', 3)
+    rows = read_json_rows(io.BytesIO(' [ {"name": "żurek", "price": 14},\n{"name": "bigos"} ] '.encode()))
+    assert list(rows) == [{'name': 'żurek', 'price': 14}, {'name': 'bigos'}]
+    assert list(read_json_rows(io.BytesIO(b'[]'))) == []
+    with pytest.raises(MenuFormatError):
+        list(read_json_rows(io.BytesIO(b'[{"name": "bigos"} {"name": "pierogi"}]')))
@@ -0,0 +1,94 @@
+import datetime
+import re
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from lunchtime.models import Restaurant
+
+TODAY = datetime.date.today()
+
+# Tables smaller than this are read whole by planner for good reason, so their scans are allowed.
+LARGE_TABLE_ROWS = 1000
+# Scale of seeded data where planner prefers indexes.
+PLAN_SCALE = {'restaurants': 200, 'tables': 8, 'meals': 20, 'users': 100, 'days': 10, 'reviews': 10}
+
+
+def query_plan(sql):
+    """Return list of lines of query plan chosen by planner."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def scanned_table(line):
+    """Return name of lunchtime table which line of query plan reads whole, None if it reads no such table."""
+    if connection.vendor == 'postgresql':
+        match = re.search(r'Seq Scan on (lunchtime_\w+)', line)
+    elif 'USING' in line or 'VIRTUAL TABLE' in line:
+        match = None
+    else:
+        match = re.match(r'SCAN (?:TABLE )?(lunchtime_\w+)', line)
+    return match[1] if match else None
+
+
+def table_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+        return cursor.fetchone()[0]
+
+
+def sequential_scans(url, client):
+    """Request url and return list of queries with sequential scan of large lunchtime table in their plans."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    scans = []
+    for query in context.captured_queries:
+        sql = query['sql']
+        if 'lunchtime_' not in sql or not sql.startswith('SELECT'):
+            continue
+        for line in query_plan(sql):
+            table = scanned_table(line)
+            if table and table_rows(table) >= LARGE_TABLE_ROWS:
+                scans.append((sql, line))
+    return scans
+
+
+@pytest.fixture
+def owner(seeded_data):
+    """Collect statistics of seeded tables. Return owner of restaurants with owner's permissions."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    owner = Restaurant.objects.first().owner
+    owner.user_permissions.add(*Permission.objects.filter(codename__in=[
+        'add_restaurant', 'delete_restaurant', 'add_table', 'delete_table', 'change_meal', 'delete_meal']))
+    return owner
+
+
+VIEWS = [
+    '/restaurant_list/',
+    '/restaurant_list/?sort=rating&min_rating=2&min_price=10&max_price=30&open_now=on',
+    '/restaurant/{restaurant}/',
+    '/user_restaurant/',
+    '/reservation_list/',
+    '/reservation_list/?all=1',
+    '/review_list/',
+    '/select_restaurant/{today}/12:30:00/?persons=2',
+    '/add_reservation/{today}/12:30:00/{restaurant}/?persons=2',
+    '/search/?q=pierogi',
+    '/restaurant_autocomplete/?q=rest',
+]
+
+
+@pytest.mark.parametrize('seeded_data', [PLAN_SCALE], indirect=True, ids=['plan-scale'])
+def test_views_use_indexes(client, owner):
+    client.force_login(user=owner)
+    restaurant = Restaurant.objects.filter(owner=owner).first()
+    scans = {url: sequential_scans(url.format(restaurant=restaurant.id, today=TODAY), client) for url in VIEWS}
+    assert {url: found for url, found in scans.items() if found} == {}
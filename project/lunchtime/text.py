@@ -0,0 +1,9 @@
+import unicodedata
+
+FOLDED_LETTERS = str.maketrans({'ł': 'l', 'Ł': 'L'})
+
+
+def fold(text):
+    """Return text in lowercase without diacritics, so "Pieczeń" and "pieczen" are the same word."""
+    text = unicodedata.normalize('NFKD', text.translate(FOLDED_LETTERS))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
@@ -1,17 +1,99 @@
+import datetime
+import functools
+import hmac
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.shortcuts import render, redirect
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.models import User
-
-from .models import Restaurant, Table, Meal, Reservation, Review
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import bitmaps
+from .api import JsonApiMixin, logo_url, resource_rows
+from .asyncdb import gather_queries, run_query
+from .autocomplete import restaurants_by_prefix
+from .availability import available_restaurants, open_at
+from .booking import book_table, TableUnavailable
+from .cache import bump_fragment_version, fragment_version, menu_snapshots, review_snapshots, FRAGMENT_TIMEOUT
+from .holds import held_by_others
+from .images import schedule_renditions
+from .kitchen import prep_queue
+from .menus import export_menu, import_menu, read_csv_rows, read_json_rows, MenuFormatError, EXPORT_CONTENT_TYPES
+from .metrics import Budget, prometheus
+from .models import Restaurant, Table, Meal, Reservation, Review, CATEGORIES, MAX_PERSONS
+from .pagination import KeysetPaginationMixin
+from .search import search
+from .wizard import BookingWizard
 from django.urls import reverse_lazy
 from django.views.generic import FormView, ListView, View, UpdateView, CreateView, DeleteView
-from .forms import AddUserForm, AddTableForm, LoginForm, SelectRestaurantForm, SelectDateAndTimeForm
+from .forms import AddUserForm, AddTableForm, LoginForm, SelectRestaurantForm, SelectDateAndTimeForm, \
+    AddRestaurantForm, RestaurantFilterForm, AddMealForm, AddReviewForm, MenuImportForm
 
 
 # Create your views here.
 
 
+def party_size(request):
+    """Return number of persons given in request's GET parameter, at most MAX_PERSONS. Return 1 if it is missing
+    or malformed.
+    """
+    persons = request.GET.get('persons', '')
+    return min(max(int(persons), 1), MAX_PERSONS) if persons.isdecimal() else 1
+
+
+def booking_wizard(request, date, time):
+    """Return user's booking wizard at date and time given in URL. Raise Http404 for invalid date or time.
+
+    Wizard is started again from URL and `persons` GET parameter when user didn't come from previous step,
+    without writing session until the state changes.
+    """
+    try:
+        date, time = datetime.date.fromisoformat(date), datetime.time.fromisoformat(time)
+    except ValueError:
+        raise Http404('Niepoprawna data lub godzina.')
+    wizard = BookingWizard(request.session)
+    if not wizard.matches(date, time, party_size(request) if 'persons' in request.GET else None):
+        wizard.start(request.user.id, date, time, party_size(request), save=False)
+    return wizard
+
+
+def menu_snapshot(restaurant_id):
+    """Return list of restaurant's meals read from snapshot of current version of menu."""
+    return menu_snapshots.get(restaurant_id, lambda: list(Meal.objects.filter(restaurant_id=restaurant_id)))
+
+
+def menu_by_category(restaurant_id):
+    """Return dictionary of restaurant's meals by category, read from snapshot of menu."""
+    menu = {category: [] for category, name in CATEGORIES}
+    for meal in menu_snapshot(restaurant_id):
+        menu[meal.category].append(meal)
+    return menu
+
+
+class AsyncView(View):
+    """Class-based view whose handlers are coroutines. Django 3.1 recognizes only async function views."""
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return functools.update_wrapper(async_view, view)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+
 class LandingPageView(View):
     """Display main page of application."""
     template = 'base.html'
@@ -71,22 +153,32 @@ class LogoutView(View):
 class AddRestaurantView(PermissionRequiredMixin, CreateView):
     """Add restaurant to database."""
     model = Restaurant
-    fields = ['name', 'address', 'phone', 'email', 'description', 'logo']
+    form_class = AddRestaurantForm
     permission_required = 'lunchtime.add_restaurant'
 
     def form_valid(self, form):
-        """Save data and add review to database."""
+        """Save data and add review to database. Renditions of uploaded logo are made in background."""
         form.instance.owner = self.request.user
-        return super(AddRestaurantView, self).form_valid(form)
+        response = super(AddRestaurantView, self).form_valid(form)
+        if self.object.logo:
+            schedule_renditions(self.object.logo.name)
+        return response
 
 
 class ModifyRestaurantView(PermissionRequiredMixin, UpdateView):
     """Modify restaurant details."""
     model = Restaurant
-    fields = ['name', 'address', 'phone', 'email', 'description', 'logo']
+    form_class = AddRestaurantForm
     template_name_suffix = '_update_form'
     permission_required = 'lunchtime.change_restaurant'
 
+    def form_valid(self, form):
+        """Save restaurant. Renditions of newly uploaded logo are made in background."""
+        response = super().form_valid(form)
+        if 'logo' in form.changed_data and self.object.logo:
+            schedule_renditions(self.object.logo.name)
+        return response
+
 
 class DeleteRestaurantView(PermissionRequiredMixin, DeleteView):
     """Delete restaurant from database."""
@@ -96,14 +188,94 @@ class DeleteRestaurantView(PermissionRequiredMixin, DeleteView):
     permission_required = 'lunchtime.delete_restaurant'
 
 
-class ListRestaurantView(ListView):
+class ListRestaurantView(KeysetPaginationMixin, ListView):
     """Display list of restaurants."""
+    budget = Budget(queries=6, wall_time=1.0)
     template_name = 'restaurant_list.html'
     model = Restaurant
+    paginate_by = 20
+    keyset_ordering = ('name', 'id')
+
+    def get_filter_form(self):
+        """Return form with filters given in request."""
+        if not hasattr(self, 'filter_form'):
+            self.filter_form = RestaurantFilterForm(self.request.GET)
+        return self.filter_form
+
+    def get_keyset_ordering(self):
+        """Return ordering by rating or by name."""
+        form = self.get_filter_form()
+        if form.is_valid() and form.cleaned_data['sort'] == 'rating':
+            return ('-rating', 'name', 'id')
+        return self.keyset_ordering
+
+    def get_queryset(self):
+        """Return list of restaurants filtered by opening hours, minimal rating and price of meals."""
+        restaurants = Restaurant.objects.all()
+        form = self.get_filter_form()
+        if not form.is_valid():
+            return restaurants
+        if form.cleaned_data['open_now']:
+            restaurants = restaurants.filter(open_at(timezone.localtime().time()))
+        if form.cleaned_data['min_rating']:
+            restaurants = restaurants.filter(rating__gte=form.cleaned_data['min_rating'])
+        min_price = form.cleaned_data['min_price']
+        max_price = form.cleaned_data['max_price']
+        if min_price is not None or max_price is not None:
+            meals = Meal.objects.filter(restaurant=OuterRef('pk'))
+            if min_price is not None:
+                meals = meals.filter(price__gte=min_price)
+            if max_price is not None:
+                meals = meals.filter(price__lte=max_price)
+            restaurants = restaurants.filter(Exists(meals))
+        return restaurants
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = self.get_filter_form()
+        return context
+
+
+class SearchView(View):
+    """Search restaurants and meals by name, description and address."""
+    budget = Budget(queries=6, wall_time=1.0)
+    template = 'search.html'
+
+    def get(self, request):
+        query = request.GET.get('q', '')
+        return render(request, self.template, {'query': query, 'results': search(query)})
+
+
+class RestaurantAutocompleteView(View):
+    """Return JSON list of restaurants whose name begins with given text."""
+    budget = Budget(queries=2, wall_time=0.5)
+
+    def get(self, request):
+        results = restaurants_by_prefix(request.GET.get('q', ''))
+        return JsonResponse({'results': [{'id': pk, 'name': name} for pk, name in results]})
+
+
+class MetricsView(View):
+    """Return request metrics in Prometheus text format to staff users and to scraper with bearer token
+    given in LUNCHTIME_METRICS_TOKEN setting.
+    """
+    def get(self, request):
+        token = getattr(settings, 'LUNCHTIME_METRICS_TOKEN', None)
+        authorization = request.META.get('HTTP_AUTHORIZATION', '').encode()
+        if not request.user.is_staff and not (token and hmac.compare_digest(authorization, f'Bearer {token}'.encode())):
+            raise PermissionDenied
+        lines = []
+        for name, value in menu_snapshots.stats().items():
+            metric = f'lunchtime_menu_snapshot_{name}_total'
+            lines += [f'# HELP {metric} Number of menu snapshot cache {name}.', f'# TYPE {metric} counter',
+                      f'{metric} {value}']
+        return HttpResponse(prometheus.render() + '\n'.join(lines) + '\n',
+                            content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class UserRestaurantView(PermissionRequiredMixin, ListView):
     """Display list of user's restaurants."""
+    budget = Budget(queries=5)
     template_name = 'lunchtime/restaurants_list.html'
     model = Restaurant
     permission_required = 'lunchtime.add_restaurant'
@@ -116,23 +288,191 @@ class UserRestaurantView(PermissionRequiredMixin, ListView):
 
 class RestaurantView(View):
     """Display details about restaurant."""
+    budget = Budget(queries=9, wall_time=1.0)
     template = 'restaurant_view.html'
 
     def get(self, request, restaurant_id):
+        """Return restaurant page. Menu and reviews are read only when their cached fragments are outdated,
+        from snapshots recomputed by one request at a time."""
         restaurant = Restaurant.objects.get(pk=restaurant_id)
-        menu_breakfast = Meal.objects.filter(restaurant_id=restaurant_id, category=1)
-        menu_lunch = Meal.objects.filter(restaurant_id=restaurant_id, category=2)
-        menu_dinner = Meal.objects.filter(restaurant_id=restaurant_id, category=3)
-        reviews = Review.objects.filter(restaurant_id=restaurant_id)
+        menu = SimpleLazyObject(lambda: menu_by_category(restaurant_id))
+        reviews = SimpleLazyObject(lambda: review_snapshots.get(restaurant_id, lambda: list(
+            Review.objects.filter(restaurant_id=restaurant_id).select_related('user'))))
         tables = Table.objects.filter(restaurant_id=restaurant_id)
-        reservations = Reservation.objects.filter(restaurant_id=restaurant_id)
+        reservations = Reservation.objects.filter(restaurant_id=restaurant_id).select_related('table')
         return render(request, self.template, {'restaurant': restaurant,
-                                               'menu_breakfast': menu_breakfast,
-                                               'menu_lunch': menu_lunch,
-                                               'menu_dinner': menu_dinner,
+                                               'menu_breakfast': SimpleLazyObject(lambda: menu[1]),
+                                               'menu_lunch': SimpleLazyObject(lambda: menu[2]),
+                                               'menu_dinner': SimpleLazyObject(lambda: menu[3]),
                                                'reviews': reviews,
                                                'tables': tables,
-                                               'reservations': reservations})
+                                               'reservations': reservations,
+                                               'menu_version': fragment_version(restaurant_id, 'menu'),
+                                               'reviews_version': fragment_version(restaurant_id, 'reviews'),
+                                               'cache_timeout': FRAGMENT_TIMEOUT})
+
+
+class AvailabilityJsonView(AsyncView):
+    """Return JSON list of restaurants with free table at date and time, best rated first."""
+    budget = Budget(queries=1, wall_time=1.0)
+
+    async def get(self, request, date, time):
+        try:
+            date, time = datetime.date.fromisoformat(date), datetime.time.fromisoformat(time)
+        except ValueError:
+            raise Http404('Niepoprawna data lub godzina.')
+        persons = party_size(request)
+        restaurants = await run_query(list, available_restaurants(date, time, persons))
+        return JsonResponse({'date': date, 'time': time, 'persons': persons,
+                             'restaurants': [{'id': restaurant.id, 'name': restaurant.name,
+                                              'rating': restaurant.rating} for restaurant in restaurants]})
+
+
+class RestaurantsApiView(JsonApiMixin, View):
+    """Return JSON page of restaurants ordered by name."""
+    budget = Budget(queries=2)
+    api_fields = ('id', 'name', 'address', 'phone', 'email', 'description', 'logo', 'opens_at', 'closes_at',
+                  'rating', 'review_count', 'updated_at')
+    converters = {'logo': logo_url}
+    keyset_ordering = ('name', 'id')
+
+    def get_version(self):
+        return Restaurant.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+
+    def get_queryset(self):
+        return Restaurant.objects.all()
+
+
+class RestaurantApiView(RestaurantsApiView):
+    """Return JSON with restaurant's details."""
+    keyset_ordering = None
+
+    def get_version(self):
+        return self.get_queryset().values_list('updated_at', flat=True).first()
+
+    def get_queryset(self):
+        return Restaurant.objects.filter(pk=self.kwargs['restaurant_id'])
+
+
+class RestaurantResourceMixin:
+    """JSON list of objects of restaurant given by `restaurant_id`, 404 for missing restaurant."""
+    def get_parent_queryset(self):
+        return Restaurant.objects.filter(pk=self.kwargs['restaurant_id'])
+
+
+class MealsApiView(RestaurantResourceMixin, JsonApiMixin, View):
+    """Return JSON page of restaurant's meals ordered by category. Version of menu is read from cache."""
+    budget = Budget(queries=2)
+    api_fields = ('id', 'category', 'name', 'description', 'price', 'updated_at')
+    keyset_ordering = ('category', 'name', 'id')
+
+    def get_version(self):
+        return fragment_version(self.kwargs['restaurant_id'], 'menu')
+
+    def get_queryset(self):
+        return Meal.objects.filter(restaurant_id=self.kwargs['restaurant_id'])
+
+
+class TablesApiView(RestaurantResourceMixin, JsonApiMixin, View):
+    """Return JSON page of restaurant's tables ordered by number of seats."""
+    budget = Budget(queries=3)
+    api_fields = ('id', 'persons', 'updated_at')
+    keyset_ordering = ('persons', 'id')
+
+    def get_version(self):
+        return self.get_queryset().aggregate(count=Count('id'), updated_at=Max('updated_at'))
+
+    def get_queryset(self):
+        return Table.objects.filter(restaurant_id=self.kwargs['restaurant_id'])
+
+
+class ReviewsApiView(RestaurantResourceMixin, JsonApiMixin, View):
+    """Return JSON page of restaurant's reviews, the latest first. Version of reviews is read from cache."""
+    budget = Budget(queries=2)
+    api_fields = ('id', 'rate', 'review', 'username', 'date')
+    columns = {'username': 'user__username'}
+    keyset_ordering = ('-date', '-id')
+
+    def get_version(self):
+        return fragment_version(self.kwargs['restaurant_id'], 'reviews')
+
+    def get_queryset(self):
+        return Review.objects.filter(restaurant_id=self.kwargs['restaurant_id'])
+
+
+class RestaurantDetailsApiView(AsyncView):
+    """Return JSON with restaurant's details, menu, tables and the latest reviews, as the resources above
+    send them. The four reads run concurrently.
+    """
+    budget = Budget(queries=4, wall_time=1.0)
+    reviews_limit = 20
+
+    async def get(self, request, restaurant_id):
+        restaurant, meals, tables, reviews = await gather_queries(
+            lambda: resource_rows(RestaurantApiView, restaurant_id=restaurant_id),
+            lambda: resource_rows(MealsApiView, restaurant_id=restaurant_id),
+            lambda: resource_rows(TablesApiView, restaurant_id=restaurant_id),
+            lambda: resource_rows(ReviewsApiView, self.reviews_limit, restaurant_id=restaurant_id))
+        if not restaurant:
+            raise Http404('Nie ma takiej restauracji.')
+        return JsonResponse({**restaurant[0], 'meals': meals, 'tables': tables, 'reviews': reviews})
+
+
+class MenuApiView(AsyncView):
+    """Return JSON with the whole restaurant's menu by category. Restaurant and meals are read concurrently."""
+    budget = Budget(queries=2, wall_time=1.0)
+
+    async def get(self, request, restaurant_id):
+        exists, meals = await gather_queries(Restaurant.objects.filter(pk=restaurant_id).exists,
+                                             lambda: resource_rows(MealsApiView, restaurant_id=restaurant_id))
+        if not exists:
+            raise Http404('Nie ma takiej restauracji.')
+        menu = {name: [] for category, name in CATEGORIES}
+        names = dict(CATEGORIES)
+        for meal in meals:
+            menu[names[meal['category']]].append(meal)
+        return JsonResponse({'restaurant': restaurant_id, 'menu': menu})
+
+
+class ReservationsApiView(LoginRequiredMixin, JsonApiMixin, View):
+    """Return JSON page of user's reservations, the latest first."""
+    budget = Budget(queries=4)
+    api_fields = ('id', 'restaurant', 'restaurant_name', 'table', 'date', 'time', 'duration', 'end_time',
+                  'updated_at')
+    columns = {'restaurant': 'restaurant_id', 'restaurant_name': 'restaurant__name', 'table': 'table_id'}
+    keyset_ordering = ('-date', '-time', 'id')
+
+    def get_version(self):
+        return self.get_queryset().aggregate(count=Count('id'), updated_at=Max('updated_at'))
+
+    def get_queryset(self):
+        return Reservation.objects.filter(user=self.request.user)
+
+
+class RestaurantOwnerMixin(PermissionRequiredMixin):
+    """Allow access to restaurant given by `restaurant_id` only to its owner and staff with required permissions."""
+    permission_required = ()
+
+    def has_permission(self):
+        user = self.request.user
+        return user.is_authenticated and super().has_permission() and (
+            user.is_staff or Restaurant.objects.filter(pk=self.kwargs['restaurant_id'], owner=user).exists())
+
+
+class KitchenView(RestaurantOwnerMixin, View):
+    """Return JSON with meals to serve in restaurant by time slot, for kitchen screen of restaurant's owner."""
+    budget = Budget(queries=3, wall_time=0.5)
+
+    def get(self, request, restaurant_id):
+        """Return meals of the day given in `date` GET parameter, today by default. Today's past slots are skipped."""
+        now = timezone.localtime()
+        try:
+            date = datetime.date.fromisoformat(request.GET.get('date', '')) if 'date' in request.GET else now.date()
+        except ValueError:
+            return JsonResponse({'error': 'Niepoprawna data.'}, status=400)
+        since = now.time() if date == now.date() else None
+        return JsonResponse({'restaurant': restaurant_id, 'date': date,
+                             'slots': prep_queue(restaurant_id, date, since)})
 
 
 class AddTableView(PermissionRequiredMixin, CreateView):
@@ -153,17 +493,23 @@ class DeleteTableView(PermissionRequiredMixin, DeleteView):
 class AddMealView(PermissionRequiredMixin, CreateView):
     """Add meal to database."""
     model = Meal
-    fields = ['restaurant', 'category', 'name', 'description', 'price']
+    form_class = AddMealForm
     permission_required = 'lunchtime.add_meal'
 
 
 class ModifyMealView(PermissionRequiredMixin, UpdateView):
     """Modify meal details."""
     model = Meal
-    fields = ['restaurant', 'category', 'name', 'description', 'price']
+    form_class = AddMealForm
     template_name_suffix = '_update_form'
     permission_required = 'lunchtime.change_meal'
 
+    def form_valid(self, form):
+        """Save meal. Meal moved to another restaurant invalidates menu of the previous one too."""
+        if 'restaurant' in form.changed_data:
+            bump_fragment_version(form.initial['restaurant'], 'menu')
+        return super().form_valid(form)
+
 
 class DeleteMealView(PermissionRequiredMixin, DeleteView):
     """Delete meal from database."""
@@ -173,15 +519,68 @@ class DeleteMealView(PermissionRequiredMixin, DeleteView):
     success_url = reverse_lazy('restaurants-list')
 
 
-class ListReservationView(LoginRequiredMixin, ListView):
+class ImportMenuView(RestaurantOwnerMixin, View):
+    """Create and update meals of restaurant's menu from uploaded CSV or JSON file."""
+    template = 'lunchtime/menu_import.html'
+    permission_required = ('lunchtime.add_meal', 'lunchtime.change_meal')
+
+    def get(self, request, restaurant_id):
+        restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+        return render(request, self.template, {'restaurant': restaurant, 'form': MenuImportForm()})
+
+    def post(self, request, restaurant_id):
+        """Import meals of uploaded file. Display numbers of created and updated meals or errors of rows."""
+        restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+        form = MenuImportForm(request.POST, request.FILES)
+        result = None
+        if form.is_valid():
+            file = form.cleaned_data['file']
+            rows = read_json_rows(file) if file.name.lower().endswith('.json') else read_csv_rows(file)
+            try:
+                result = import_menu(restaurant_id, rows)
+            except MenuFormatError as error:
+                form.add_error('file', str(error))
+        return render(request, self.template, {'restaurant': restaurant, 'form': form, 'result': result},
+                      status=400 if result is None or result.error_count else 200)
+
+
+class ExportMenuView(RestaurantOwnerMixin, View):
+    """Send restaurant's menu as CSV or JSON file, chosen by `format` GET parameter, streamed in chunks.
+
+    Under ASGI allowed requests are served by MenuExportStream instead.
+    """
+    content_types = EXPORT_CONTENT_TYPES
+
+    def get(self, request, restaurant_id):
+        format = request.GET.get('format', 'csv')
+        if format not in self.content_types:
+            return HttpResponse('Nieznany format.', status=400)
+        response = StreamingHttpResponse(export_menu(restaurant_id, format), content_type=self.content_types[format])
+        response['Content-Disposition'] = f'attachment; filename="menu-{restaurant_id}.{format}"'
+        return response
+
+
+class ListReservationView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """Display list of user's reservations"""
+    budget = Budget(queries=6, wall_time=1.0)
     template_name = 'lunchtime/reservations_list.html'
     model = Reservation
+    paginate_by = 20
+    keyset_ordering = ('-date', '-time', 'id')
 
     def get_queryset(self):
-        """Return list of user's reservation."""
+        """Return list of user's reservation. Past reservations are listed only on demand."""
         user = self.request.user
-        return Reservation.objects.filter(user=user)
+        reservations = Reservation.objects.filter(user=user).select_related('restaurant', 'table') \
+            .prefetch_related('meal')
+        if not self.request.GET.get('all'):
+            reservations = reservations.filter(date__gte=timezone.localdate())
+        return reservations
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['show_all'] = bool(self.request.GET.get('all'))
+        return context
 
 
 class SelectDateAndTimeView(LoginRequiredMixin, View):
@@ -192,54 +591,84 @@ class SelectDateAndTimeView(LoginRequiredMixin, View):
         return render(request, 'lunchtime/reservation_form.html', {'form': form})
 
     def post(self, request):
-        """Save data about selected date and time and redirect to select restaurant form."""
+        """Start booking wizard at selected date and time and redirect to select restaurant form."""
         form = SelectDateAndTimeForm(request.POST)
         if form.is_valid():
             date = form.cleaned_data['date']
             time = form.cleaned_data['time']
-            return redirect(f'/select_restaurant/{date}/{time}/')
+            persons = form.cleaned_data['persons'] or 1
+            BookingWizard(request.session).start(request.user.id, date, time, persons)
+            return redirect(f'/select_restaurant/{date}/{time}/?persons={persons}')
         return render(request, 'lunchtime/reservation_form.html', {'form': form})
 
 
 class SelectRestaurantView(LoginRequiredMixin, View):
     """Allows user to select restaurant for reservation."""
+    budget = Budget(queries=8, wall_time=1.0)
+    template = 'select_restaurant.html'
+
+    def render_form(self, request, wizard, form=None):
+        """Return form to select one of restaurants with free table, best rated first."""
+        restaurants = available_restaurants(wizard.date, wizard.time, wizard.persons, user=request.user)
+        if form is None:
+            form = SelectRestaurantForm()
+        return render(request, self.template, {'form': form, 'restaurants': restaurants, 'persons': wizard.persons,
+                                               'date': wizard.date.isoformat(), 'time': wizard.time.isoformat()})
 
     def get(self, request, date, time):
         """Return form to select restaurant."""
-        form = SelectRestaurantForm()
-        return render(request, 'select_restaurant.html', {'form': form})
+        return self.render_form(request, booking_wizard(request, date, time))
 
     def post(self, request, date, time):
-        """Save data about selected restaurant and redirect to reservation table form."""
-        form = SelectRestaurantForm(request.POST)
+        """Save selected restaurant in booking wizard and redirect to reservation table form."""
+        wizard = booking_wizard(request, date, time)
+        restaurants = available_restaurants(wizard.date, wizard.time, wizard.persons, limit=None, user=request.user)
+        form = SelectRestaurantForm(request.POST, restaurants=restaurants)
         if form.is_valid():
-            restaurant = Restaurant.objects.get(pk=form.cleaned_data['restaurant'].id)
-            return redirect(f'/add_reservation/{date}/{time}/{restaurant.id}')
-        return render(request, 'select_restaurant.html', {'form': form})
+            restaurant = form.cleaned_data['restaurant']
+            wizard.choose_restaurant(request.user.id, restaurant.id)
+            return redirect(f'/add_reservation/{date}/{time}/{restaurant.id}/?persons={wizard.persons}')
+        return self.render_form(request, wizard, form)
 
 
 class AddReservationView(LoginRequiredMixin, View):
+    """Allows user to select table and meals and save reservation."""
+    budget = Budget(queries=21, wall_time=1.0)
     template_name = 'lunchtime/reservation_table.html'
 
+    @staticmethod
+    def available_tables(request, wizard, restaurant_id):
+        """Return restaurant's tables for party of wizard which are free and not held by other users."""
+        tables = bitmaps.free_tables(restaurant_id, wizard.date, wizard.time, persons=wizard.persons)
+        held = held_by_others(request.user.id, [table.id for table in tables], wizard.date, wizard.time)
+        return [table for table in tables if table.id not in held]
+
     def get(self, request, date, time, restaurant_id):
-        available_tables = Table.objects.filter(restaurant_id=restaurant_id, reserved=False)
-        restaurant_menu = Meal.objects.filter(restaurant_id=restaurant_id)
+        """Return form with free tables, the first of which is held for user, and restaurant's menu."""
+        wizard = booking_wizard(request, date, time)
+        wizard.choose_restaurant(request.user.id, int(restaurant_id))
+        available_tables = self.available_tables(request, wizard, restaurant_id)
         if available_tables:
             return render(request, self.template_name, {'available_tables': available_tables,
-                                                        'menu': restaurant_menu})
+                                                        'held_table': wizard.hold(request.user.id, available_tables),
+                                                        'menu': menu_snapshot(restaurant_id)})
         message = 'Brak wolnych stolików. Zmień datę lub godzinę.'
         return render(request, self.template_name, {'message': message})
 
     def post(self, request, date, time, restaurant_id):
-        table_id = request.POST.get('table_id')
+        """Reserve selected table. Return form with conflict status when table has been taken meanwhile."""
+        wizard = booking_wizard(request, date, time)
+        table_id = request.POST.get('table_id', '')
         meals = Meal.objects.filter(id__in=request.POST.getlist('meals'))
-        user = self.request.user
-        new_reservation = Reservation.objects.create(restaurant_id=restaurant_id, table_id=table_id, date=date,
-                                                     time=time, user=user)
-        new_reservation.meal.set(meals)
-        table = Table.objects.get(pk=table_id)
-        table.reserved = True
-        table.save()
+        try:
+            if not table_id.isdecimal():
+                raise TableUnavailable('Wybierz stolik.')
+            book_table(request.user, restaurant_id, table_id, wizard.date, wizard.time, meals)
+        except TableUnavailable as error:
+            tables = self.available_tables(request, wizard, restaurant_id)
+            return render(request, self.template_name, {'message': error, 'available_tables': tables,
+                                                        'menu': menu_snapshot(restaurant_id)}, status=409)
+        wizard.clear(request.user.id)
         return redirect('/reservation_list')
 
 
@@ -252,24 +681,26 @@ class DeleteReservationView(LoginRequiredMixin, DeleteView):
 
 class ListReviewsView(LoginRequiredMixin, ListView):
     """Display list of user's review."""
+    budget = Budget(queries=5)
     template_name = 'lunchtime/reviews_list.html'
     model = Review
 
     def get_queryset(self):
         """Return list of user's review."""
         user = self.request.user
-        return Review.objects.filter(user=user)
+        return Review.objects.filter(user=user).select_related('restaurant')
 
 
 class AddReviewView(LoginRequiredMixin, CreateView):
     """Add review to database."""
     model = Review
     template_name = 'lunchtime/review_form.html'
-    fields = ['restaurant', 'rate', 'review']
+    form_class = AddReviewForm
     success_url = reverse_lazy('reviews-list')
-    
+
+    @transaction.atomic
     def form_valid(self, form):
-        """Save data and add review to database."""
+        """Save data and add review to database. Restaurant's rating is updated in the same transaction."""
         form.instance.user = self.request.user
         return super(AddReviewView, self).form_valid(form)
 
@@ -280,4 +711,7 @@ class DeleteReviewView(LoginRequiredMixin, DeleteView):
     model = Review
     success_url = reverse_lazy('reviews-list')
 
-
+    @transaction.atomic
+    def delete(self, request, *args, **kwargs):
+        """Delete review. Restaurant's rating is updated in the same transaction."""
+        return super(DeleteReviewView, self).delete(request, *args, **kwargs)
@@ -0,0 +1,18 @@
+from django import forms
+from django.urls import reverse_lazy
+
+from .models import Restaurant
+
+
+class RestaurantAutocompleteWidget(forms.Widget):
+    """Pick restaurant by typing beginning of its name. Only the selected restaurant is read from database."""
+    template_name = 'lunchtime/widgets/restaurant_autocomplete.html'
+    url = reverse_lazy('restaurant-autocomplete')
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value:
+            label = Restaurant.objects.filter(pk=value).values_list('name', flat=True).first() or ''
+        context['widget'].update({'label': label, 'url': self.url})
+        return context
@@ -0,0 +1,92 @@
+import datetime
+
+from .holds import hold_table, release_table
+
+SESSION_KEY = 'lunchtime_booking'
+
+
+class BookingWizard:
+    """State of user's booking wizard kept in session.
+
+    Holds date, time and party size validated by the first step, restaurant chosen in the second one and
+    table held for user while meals are chosen, so later steps neither parse them again nor look them up.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.state = session.get(SESSION_KEY, {})
+
+    @property
+    def date(self):
+        return datetime.date.fromisoformat(self.state['date']) if 'date' in self.state else None
+
+    @property
+    def time(self):
+        return datetime.time.fromisoformat(self.state['time']) if 'time' in self.state else None
+
+    @property
+    def persons(self):
+        return self.state.get('persons', 1)
+
+    @property
+    def restaurant_id(self):
+        return self.state.get('restaurant_id')
+
+    @property
+    def table_id(self):
+        return self.state.get('table_id')
+
+    def matches(self, date, time, persons=None):
+        """Return True when wizard is at given date and time, and for given number of persons if it is given."""
+        if not self.state or self.date != date or self.time != time:
+            return False
+        return persons is None or self.persons == persons
+
+    def start(self, user_id, date, time, persons, save=True):
+        """Begin booking at date and time for number of persons. Release table held by previous booking.
+
+        State which isn't saved is stored in session only by the first step which changes it.
+        """
+        self.clear(user_id)
+        self.state = {'date': str(date), 'time': str(time), 'persons': persons}
+        if save:
+            self.save()
+
+    def choose_restaurant(self, user_id, restaurant_id):
+        """Remember chosen restaurant. Release table held in other restaurant."""
+        if self.restaurant_id != restaurant_id:
+            self.release(user_id)
+            self.state['restaurant_id'] = restaurant_id
+            self.save()
+
+    def hold(self, user_id, tables):
+        """Hold the first of tables which nobody else holds, preferring the one held already. Return its id."""
+        ids = [table.id for table in tables]
+        if self.table_id in ids:
+            ids.remove(self.table_id)
+            ids.insert(0, self.table_id)
+        else:
+            self.release(user_id)
+        for table_id in ids:
+            if hold_table(user_id, table_id, self.date, self.time):
+                if self.table_id != table_id:
+                    self.state['table_id'] = table_id
+                    self.save()
+                return table_id
+        return None
+
+    def release(self, user_id):
+        """Release table held by wizard."""
+        if self.table_id is not None:
+            release_table(user_id, self.table_id, self.date, self.time)
+            del self.state['table_id']
+            self.save()
+
+    def clear(self, user_id):
+        """Release held table and forget state, e.g. after reservation is saved."""
+        self.release(user_id)
+        self.state = {}
+        self.session.pop(SESSION_KEY, None)
+
+    def save(self):
+        """Store state in session. Session is written only by steps which change state."""
+        self.session[SESSION_KEY] = self.state
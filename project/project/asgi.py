@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from lunchtime.events import EventStream  # noqa: E402, needs Django set up by get_asgi_application
+from lunchtime.menus import MenuExportStream  # noqa: E402
+
+application = EventStream(MenuExportStream(django_application))
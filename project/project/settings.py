@@ -37,10 +37,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'lunchtime',
+    'lunchtime.apps.LunchtimeConfig',
 ]
 
 MIDDLEWARE = [
+    'lunchtime.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,7 @@ ROOT_URLCONF = 'project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'lunchtime.metrics.TimedDjangoTemplates',
         'DIRS': ['templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,6 +72,26 @@ TEMPLATES = [
 WSGI_APPLICATION = 'project.wsgi.application'
 
 
+# Request metrics: sinks which receive cost of every request and whether exceeded budgets of views
+# raise exception instead of being logged. /metrics/ is served to staff users and to scraper sending
+# "Authorization: Bearer <LUNCHTIME_METRICS_TOKEN>", if the token is set.
+
+LUNCHTIME_METRICS_SINKS = ['lunchtime.metrics.log_sink', 'lunchtime.metrics.prometheus']
+LUNCHTIME_BUDGETS_RAISE = False
+LUNCHTIME_METRICS_TOKEN = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'lunchtime.metrics': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
@@ -84,6 +105,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Versions of cached fragments and snapshots of menus are kept in the same cache. Local memory is enough
+# for one process; deployment with several processes needs a shared backend, e.g. memcached or redis.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lunchtime',
+    }
+}
+
+LUNCHTIME_SNAPSHOT_CACHE = 'default'
+
+# Server-sent events of restaurants are published through broker of single process. Deployment with
+# several processes needs broker implementing lunchtime.events.Broker over shared server, e.g. redis.
+
+LUNCHTIME_EVENT_BROKER = 'lunchtime.events.local_broker'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -122,5 +162,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
-MEDIA_ROOT = '/home/dominika/Lunchtime/media/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
+
+# collectstatic stores static files under names with hash of content together with their gzip (and brotli)
+# compressed copies. Uploaded files are named by hash of content. Both are served with immutable Cache-Control.
+STATICFILES_STORAGE = 'lunchtime.storage.CompressedManifestStaticFilesStorage'
+DEFAULT_FILE_STORAGE = 'lunchtime.storage.ContentHashedStorage'
+
+# Uploaded files are streamed to temporary file in chunks instead of being kept in memory.
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
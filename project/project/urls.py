@@ -14,14 +14,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, re_path
+from lunchtime.serving import serve
 from lunchtime.views import LandingPageView, AddUserView, AddRestaurantView, ModifyRestaurantView, ListRestaurantView, \
     DeleteRestaurantView, RestaurantView, AddTableView, DeleteTableView, AddMealView, ModifyMealView, \
     DeleteMealView, SelectRestaurantView, AddReservationView, ListReservationView, DeleteReservationView, \
     ListReviewsView, AddReviewView, DeleteReviewView, ContactPageView, LoginView, LogoutView, \
-    SelectDateAndTimeView, UserRestaurantView
+    SelectDateAndTimeView, UserRestaurantView, SearchView, RestaurantAutocompleteView, \
+    MetricsView, AvailabilityJsonView, RestaurantsApiView, RestaurantApiView, RestaurantDetailsApiView, MenuApiView, \
+    MealsApiView, TablesApiView, ReviewsApiView, ReservationsApiView, KitchenView, ImportMenuView, ExportMenuView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,12 +37,28 @@ urlpatterns = [
     path('modify_restaurant/<int:pk>/', ModifyRestaurantView.as_view(), name='modify-restaurant'),
     path('delete_restaurant/<int:pk>/', DeleteRestaurantView.as_view(), name='delete-restaurant'),
     path('restaurant/<int:restaurant_id>/', RestaurantView.as_view(), name='restaurant-details'),
+    re_path(r'^api/availability/(?P<date>[0-9]{4}-[0-9]{2}-[0-9]{2})/(?P<time>[0-9]{2}:[0-9]{2}(?::[0-9]{2})?)/$',
+            AvailabilityJsonView.as_view(), name='api-availability'),
+    path('api/restaurants/', RestaurantsApiView.as_view(), name='api-restaurants'),
+    path('api/restaurants/<int:restaurant_id>/', RestaurantApiView.as_view(), name='api-restaurant-details'),
+    path('api/restaurants/<int:restaurant_id>/details/', RestaurantDetailsApiView.as_view(), name='api-details'),
+    path('api/restaurants/<int:restaurant_id>/menu/', MenuApiView.as_view(), name='api-menu'),
+    path('api/restaurants/<int:restaurant_id>/meals/', MealsApiView.as_view(), name='api-meals'),
+    path('api/restaurants/<int:restaurant_id>/tables/', TablesApiView.as_view(), name='api-tables'),
+    path('api/restaurants/<int:restaurant_id>/reviews/', ReviewsApiView.as_view(), name='api-reviews'),
+    path('api/restaurants/<int:restaurant_id>/kitchen/', KitchenView.as_view(), name='api-kitchen'),
+    path('api/reservations/', ReservationsApiView.as_view(), name='api-reservations'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('restaurant_autocomplete/', RestaurantAutocompleteView.as_view(), name='restaurant-autocomplete'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('user_restaurant/', UserRestaurantView.as_view(), name='user-restaurants'),
     path('add_table/', AddTableView.as_view(), name='add-table'),
     path('delete_table/<int:pk>/', DeleteTableView.as_view(), name='delete-table'),
     path('add_meal/', AddMealView.as_view(), name='add-meal'),
     path('modify_meal/<int:pk>/', ModifyMealView.as_view(), name='modify-meal'),
     path('delete_meal/<int:pk>/', DeleteMealView.as_view(), name='delete-meal'),
+    path('import_menu/<int:restaurant_id>/', ImportMenuView.as_view(), name='import-menu'),
+    path('export_menu/<int:restaurant_id>/', ExportMenuView.as_view(), name='export-menu'),
     path('reservation_list/', ListReservationView.as_view(), name='reservations-list'),
     path('select_date_time/', SelectDateAndTimeView.as_view(), name='select-date-time'),
     re_path(r'select_restaurant/(?P<date>[0-9]{4}-?[0-9]{2}-?[0-9]{2})/(?P<time>[0-9]{2}:?[0-9]{2}:?[0-9]{2})/',
@@ -51,5 +69,8 @@ urlpatterns = [
     path('review_list/', ListReviewsView.as_view(), name='reviews-list'),
     path('add_review/', AddReviewView.as_view(), name='add-review'),
     path('delete_review/<int:pk>/', DeleteReviewView.as_view(), name='delete-review'),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) \
-  + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.+)$', serve, {'document_root': settings.STATIC_ROOT},
+            name='static'),
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', serve, {'document_root': settings.MEDIA_ROOT},
+            name='media'),
+]